@@ -0,0 +1,118 @@
+"""Benchmark the price analytics on a synthetic multi-year history.
+
+Builds daily snapshots for several worksheets (products rotating, prices
+cut now and then, ranks shuffling) and times each analytics step. With
+--write the history is also written to a temporary Parquet store, so
+loading it from disk is timed too.
+
+Usage:
+    python benchmarks/bench_analytics.py [--years 3] [--worksheets 7] [--products 300] [--write]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import price_analytics
+from history_store import HistoryStore
+from row_schema import Row
+
+BRANDS = ['alo yoga', 'lululemon', 'vuori', 'beyond yoga', 'athleta']
+
+
+def synthetic_history(years, worksheets, products, seed=7):
+    """Arrow table shaped like HistoryStore.read(columns=HISTORY_COLUMNS)"""
+    rng = np.random.default_rng(seed)
+    days = int(years * 365)
+    start = datetime.date(2026, 10, 18) - datetime.timedelta(days=days)
+    columns = {name: [] for name in price_analytics.HISTORY_COLUMNS}
+    for w in range(worksheets):
+        brand = BRANDS[w % len(BRANDS)]
+        # Catalogue of the worksheet; a sliding window of it is listed each day
+        catalogue = products * 4
+        base = rng.integers(48, 148, catalogue) * 100
+        for day in range(days):
+            first = (day * catalogue // days) % (catalogue - products)
+            ids = np.arange(first, first + products)
+            rank = rng.permutation(products) + 1
+            price = base[ids].copy()
+            sale = rng.random(products) < 0.1
+            cut = np.where(sale, (price * 0.7).astype(np.int64) // 100 * 100, price)
+            text = np.where(sale, [f"${c // 100} ${p // 100}" for c, p in zip(cut, price)],
+                            [f"${p // 100}" for p in price])
+            columns['date'].append(np.full(products, np.datetime64(start + datetime.timedelta(days=day))))
+            columns['brand'].append(np.full(products, brand, dtype=object))
+            columns['worksheet'].append(np.full(products, f"ws{w}", dtype=object))
+            columns['index'].append(rank.astype(np.int32))
+            columns['url'].append(np.array([f"https://shop{w}.example.com/products/p{i}" for i in ids], dtype=object))
+            columns['price'].append(text.astype(object))
+    return pa.table({
+        'date': pa.array(np.concatenate(columns['date']).astype('datetime64[D]'), pa.date32()),
+        'brand': pa.array(np.concatenate(columns['brand']), pa.string()),
+        'worksheet': pa.array(np.concatenate(columns['worksheet']), pa.string()),
+        'index': pa.array(np.concatenate(columns['index']), pa.int32()),
+        'url': pa.array(np.concatenate(columns['url']), pa.string()),
+        'price': pa.array(np.concatenate(columns['price']), pa.string()),
+    })
+
+
+def timed(label, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label:<24} {time.perf_counter() - start:7.2f}s  {result.num_rows:>10,} rows")
+    return result
+
+
+def write_store(table, root):
+    """Write the synthetic rows to a HistoryStore, one file per worksheet and day"""
+    store = HistoryStore(root)
+    for (worksheet, date), part in _partitions(table):
+        rows = [Row(r['index'], date, r['brand'], '', r['price'], r['url'], '') for r in part.to_pylist()]
+        store.write(worksheet, rows)
+    return store
+
+
+def _partitions(table):
+    keys = table.select(['worksheet', 'date']).to_pylist()
+    bounds = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]] + [len(keys)]
+    for a, b in zip(bounds, bounds[1:]):
+        yield (keys[a]['worksheet'], keys[a]['date']), table.slice(a, b - a)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--worksheets', type=int, default=7)
+    parser.add_argument('--products', type=int, default=300)
+    parser.add_argument('--write', action='store_true', help='also time loading from a Parquet store')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    raw = synthetic_history(args.years, args.worksheets, args.products)
+    print(f"Generated {raw.num_rows:,} rows ({args.years:g} years x {args.worksheets} worksheets x "
+          f"{args.products} products) in {time.perf_counter() - start:.1f}s")
+
+    if args.write:
+        with tempfile.TemporaryDirectory() as root:
+            start = time.perf_counter()
+            store = write_store(raw, root)
+            print(f"Wrote the history store in {time.perf_counter() - start:.1f}s")
+            table = timed('load + parse prices', price_analytics.load, store=store)
+    else:
+        table = timed('parse prices', price_analytics.with_prices, raw)
+
+    timed('price changes', price_analytics.price_changes, table)
+    timed('markdowns', price_analytics.markdowns, table)
+    timed('rank movement', price_analytics.rank_movement, table)
+    timed('weekly brand summary', price_analytics.brand_summary, table, by='week')
+
+
+if __name__ == '__main__':
+    main()
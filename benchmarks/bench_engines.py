@@ -0,0 +1,175 @@
+"""Benchmark the Selenium engine against the asyncio DevTools engine on a local fixture site.
+
+Serves collection pages that lazy-load their tiles while scrolling, with
+an artificial delay on every request, then scrapes the same collections
+with scrape_engine.run() (one page at a time, as the scrapers do today)
+and with cdp_engine.run() (all collections side by side in one event
+loop). Prints the wall time of each and checks both read the same rows.
+
+Needs Chrome (and chromedriver for the Selenium side, which
+webdriver-manager downloads).
+
+Usage:
+    python benchmarks/bench_engines.py [--collections 6] [--tiles 120] [--latency 0.3] [--engine both]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Keep checkpoints, snapshots and metrics of this run away from the real state directory
+os.environ['SCRAPER_STATE_DIR'] = tempfile.mkdtemp(prefix='bench-engines-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cdp_engine
+import scrape_engine
+from brands import BrandConfig, Collection, Field
+from driver_pool import create_driver
+from run_metrics import recording
+
+BATCH = 24
+
+PAGE = """<!doctype html>
+<html><head><title>Collection %(name)s</title>
+<style>.tile { height: 320px; margin: 8px; border: 1px solid #ddd }</style></head>
+<body><main id="grid">%(tiles)s</main>
+<script>
+const total = %(total)d;
+let loading = false;
+window.addEventListener('scroll', async () => {
+    const grid = document.getElementById('grid');
+    const shown = grid.children.length;
+    if (loading || shown >= total || window.innerHeight + window.pageYOffset < document.body.scrollHeight - 800) return;
+    loading = true;
+    const response = await fetch('/tiles/%(name)s?offset=' + shown);
+    grid.insertAdjacentHTML('beforeend', await response.text());
+    loading = false;
+});
+</script></body></html>
+"""
+
+
+def tile(collection, n):
+    return (f'<div class="tile"><a class="name" href="/products/{collection}-{n}">Product {collection} {n}</a>'
+            f'<span class="price">${48 + n % 60}</span><img src="/images/{collection}-{n}.jpg"></div>')
+
+
+def tiles(collection, start, stop):
+    return ''.join(tile(collection, n) for n in range(start, stop))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    latency = 0.3
+    total = 120
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        parts = urlsplit(self.path)
+        name = parts.path.rsplit('/', 1)[-1]
+        if parts.path.startswith('/collections/'):
+            body = PAGE % {'name': name, 'total': self.total, 'tiles': tiles(name, 0, BATCH)}
+        elif parts.path.startswith('/tiles/'):
+            offset = int(parse_qs(parts.query).get('offset', ['0'])[0])
+            body = tiles(name, offset, min(offset + BATCH, self.total))
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def fixture_config(base, collections, load_wait):
+    return BrandConfig(
+        name='fixture',
+        brand='fixture',
+        collections=[Collection(f"fixture_{n}", f"{base}/collections/c{n}") for n in range(collections)],
+        site_url=base,
+        tile_selector='.tile',
+        tile_scope='.tile',
+        popup_selectors=[],
+        load_wait=load_wait,
+        fields={
+            'Product Name': Field(['a.name'], default="Name not found"),
+            'Price': Field(['.price'], default="Price not found"),
+            'URL': Field(['a.name'], attrs=('href',), absolute=True),
+            'Image URL': Field(['img'], attrs=('src',), absolute=True),
+        },
+    )
+
+
+class ListSink:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, sheet_name, rows):
+        self.rows[sheet_name] = rows
+
+    def flush(self):
+        return 0
+
+
+def rows_of(results):
+    return {name: sorted((row.name, row.price, row.url) for row in rows) for name, rows in results.items()}
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    with recording(f"bench_{label}"):
+        results = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:7.1f}s  {sum(len(rows) for rows in results.values()):>6} rows")
+    return elapsed, results
+
+
+def run_selenium(config):
+    driver = create_driver()
+    try:
+        return scrape_engine.run(config, driver, ListSink())
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--collections', type=int, default=6)
+    parser.add_argument('--tiles', type=int, default=120, help='products per collection')
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds added to every request')
+    parser.add_argument('--load-wait', type=float, default=2.0)
+    parser.add_argument('--engine', choices=['both', 'selenium', 'cdp'], default='both')
+    args = parser.parse_args()
+
+    FixtureHandler.latency = args.latency
+    FixtureHandler.total = args.tiles
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = fixture_config(f"http://127.0.0.1:{server.server_port}", args.collections, args.load_wait)
+    print(f"{args.collections} collections x {args.tiles} tiles, {args.latency:.2f}s per request\n")
+
+    timings, results = {}, {}
+    if args.engine in ('both', 'selenium'):
+        timings['selenium'], results['selenium'] = timed('selenium', lambda: run_selenium(config))
+    if args.engine in ('both', 'cdp'):
+        timings['cdp'], results['cdp'] = timed('cdp', lambda: cdp_engine.run(config, ListSink()))
+    server.shutdown()
+
+    if len(results) == 2:
+        same = rows_of(results['selenium']) == rows_of(results['cdp'])
+        print(f"\nSpeed-up: {timings['selenium'] / timings['cdp']:.1f}x, same rows: {same}")
+    print(json.dumps({name: round(seconds, 2) for name, seconds in timings.items()}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark product detail enrichment against a local fixture server.
+
+Serves synthetic Shopify <product>.js records and JSON-LD product pages
+with an artificial delay per request, then enriches the same products
+one at a time, concurrently, and again from the cache. Also checks that
+the server never saw more than SCRAPER_DETAIL_PER_DOMAIN requests at once.
+
+Usage:
+    python benchmarks/bench_enrichment.py [--products 200] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep the cache of this run away from the real state directory
+os.environ['SCRAPER_STATE_DIR'] = tempfile.mkdtemp(prefix='bench-enrichment-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import product_details
+from row_schema import Row
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL']
+COLORS = ['Black', 'Navy', 'Sage']
+
+
+def shopify_record(n):
+    variants = []
+    for color in COLORS[:1 + n % 3]:
+        for i, size in enumerate(SIZES):
+            variants.append({'option1': color, 'option2': size, 'available': (n + i) % 4 != 0,
+                             'price': 9800, 'compare_at_price': 12800 if n % 5 == 0 else None})
+    return {'title': f"Product {n}", 'options': [{'name': 'Color'}, {'name': 'Size'}], 'variants': variants}
+
+
+def json_ld_page(n):
+    variants = [
+        {'@type': 'Product', 'size': size, 'color': color,
+         'offers': {'@type': 'Offer', 'price': '98.00',
+                    'availability': 'https://schema.org/' + ('OutOfStock' if (n + i) % 4 == 0 else 'InStock')}}
+        for color in COLORS[:1 + n % 3] for i, size in enumerate(SIZES)
+    ]
+    data = {'@context': 'https://schema.org', '@type': 'ProductGroup', 'name': f"Product {n}", 'hasVariant': variants}
+    return f'<html><head><script type="application/ld+json">{json.dumps(data)}</script></head><body></body></html>'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    latency = 0.05
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    served = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.served += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(cls.latency)
+            n = int(self.path.split('/')[-1].split('.')[0].split('-')[-1])
+            if self.path.endswith('.js'):
+                body, kind = json.dumps(shopify_record(n)).encode(), 'application/json'
+            else:
+                body, kind = json_ld_page(n).encode(), 'text/html'
+            self.send_response(200)
+            self.send_header('Content-Type', kind)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def rows_for(base, products):
+    return [Row(n + 1, '2026-10-18', 'bench', f"Product {n}", '$98', f"{base}/products/item-{n}", '')
+            for n in range(products)]
+
+
+def run(label, fn):
+    FixtureHandler.peak = FixtureHandler.served = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        details = fn()
+        seconds = time.perf_counter() - start
+    print(f"{label:<28} {seconds:7.2f}s  {len(details):>4} products  "
+          f"{FixtureHandler.served:>4} requests  peak {FixtureHandler.peak} at once")
+    return details
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the server waits per request')
+    args = parser.parse_args()
+
+    FixtureHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    rows = rows_for(base, args.products)
+
+    print(f"{args.products} products, {args.latency * 1000:.0f} ms per request, "
+          f"{product_details.DETAIL_PER_DOMAIN} per domain")
+    failed = False
+    for shopify in (True, False):
+        kind = 'shopify .js' if shopify else 'json-ld page'
+        sequential = run(f"{kind}: one at a time", lambda: {
+            row.url: product_details.fetch_details(row.url, shopify) for row in rows
+        })
+        cache = product_details.DetailCache()
+        concurrent = run(f"{kind}: concurrent", lambda: product_details.enrich(rows, shopify, cache))
+        if FixtureHandler.peak > product_details.DETAIL_PER_DOMAIN:
+            print(f"{kind}: more than {product_details.DETAIL_PER_DOMAIN} requests at once")
+            failed = True
+        run(f"{kind}: cached", lambda: product_details.enrich(rows, shopify, cache))
+        if concurrent != sequential:
+            print(f"{kind}: concurrent details differ from the sequential ones")
+            failed = True
+        # Start the next round with a cold cache
+        shutil.rmtree(os.path.join(os.environ['SCRAPER_STATE_DIR'], 'details'), ignore_errors=True)
+
+    server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
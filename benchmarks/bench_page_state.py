@@ -0,0 +1,69 @@
+"""Compare embedded-state extraction with the BeautifulSoup tile path.
+
+Usage:
+    python benchmarks/bench_page_state.py [--tiles 500] [--repeat 5]
+    python benchmarks/bench_page_state.py --brand lululemon saved_page.html ...
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_pages import PAGES
+from brands import BRANDS
+from page_state import extract_products
+from scrape_engine import parse_tiles
+
+SCRAPERS = {
+    'lululemon': BRANDS['lululemon'],
+    'athleta': BRANDS['athleta'],
+}
+
+
+def best_of(repeat, fn, *args):
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = list(fn(*args))
+            timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(label, html, config, repeat):
+    soup_time, soup_rows = best_of(repeat, parse_tiles, config, html)
+    state_time, state_rows = best_of(repeat, extract_products, html, config.brand, config.site_url)
+    same = soup_rows == state_rows
+    print(f"{label:<28} {len(html) / 1e6:6.2f} MB  "
+          f"soup {soup_time * 1000:8.1f} ms ({len(soup_rows)} rows)  "
+          f"state {state_time * 1000:7.1f} ms ({len(state_rows)} rows)  "
+          f"x{soup_time / state_time if state_time else float('inf'):.1f}  "
+          f"{'rows match' if same else 'ROWS DIFFER'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help='saved HTML pages to benchmark instead of the synthetic fixtures')
+    parser.add_argument('--brand', choices=sorted(SCRAPERS), help='brand of the saved pages')
+    parser.add_argument('--tiles', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        if not args.brand:
+            parser.error('--brand is required with saved pages')
+        for path in args.pages:
+            with open(path, encoding='utf-8') as f:
+                compare(os.path.basename(path), f.read(), SCRAPERS[args.brand], args.repeat)
+        return
+
+    for brand, config in SCRAPERS.items():
+        compare(f"{brand} ({args.tiles} tiles)", PAGES[brand](args.tiles), config, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
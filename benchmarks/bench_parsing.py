@@ -0,0 +1,206 @@
+"""Per-brand tile extraction benchmark over the checked-in fixture pages.
+
+Runs each brand's tile extraction over benchmarks/fixtures/<brand>-<tiles>.html.gz
+and reports tiles per second, the speed-up over a full-document html.parser
+run made in the same session, peak traced memory and the number of memory
+blocks the run leaves allocated, then compares them with benchmarks/baseline.json.
+Timing runs without tracemalloc; memory is measured in a separate traced run.
+
+Exits non-zero if a brand's rows change or it uses more memory than the
+baseline allows. Memory is only compared on the Python version the baseline
+was recorded with. Wall time depends on the machine, so speed is only
+reported, unless --gate-speed also fails on a drop in the speed-up ratio.
+
+Usage:
+    python benchmarks/bench_parsing.py [--brand vuori] [--repeat 3] [--gate-speed]
+    python benchmarks/bench_parsing.py --update-baseline
+    python benchmarks/bench_parsing.py --write-fixtures   # after changing fixture_pages.py
+"""
+import argparse
+import contextlib
+import gc
+import glob
+import gzip
+import io
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.check_parser_parity import TILE_PARSERS
+from benchmarks.fixture_pages import PAGES
+from scrape_engine import parse_tiles
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, 'fixtures')
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+
+# Tile counts of the checked-in fixtures
+FIXTURE_SIZES = (250, 2000)
+
+# Allowed relative drop in the speed-up over html.parser with --gate-speed; both timings are noisy
+SPEED_TOLERANCE = 0.4
+# Allowed relative growth in peak memory and blocks, which are deterministic
+MEMORY_TOLERANCE = 0.1
+
+
+def fixture_path(name, tiles):
+    return os.path.join(FIXTURE_DIR, f"{name}-{tiles}.html.gz")
+
+
+def write_fixtures():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, build in PAGES.items():
+        for tiles in FIXTURE_SIZES:
+            path = fixture_path(name, tiles)
+            # mtime=0 keeps the files byte-identical between regenerations
+            with open(path, 'wb') as f:
+                f.write(gzip.compress(build(tiles).encode('utf-8'), 9, mtime=0))
+            print(f"Wrote {path}")
+
+
+def fixtures(brands):
+    """(name, tiles, html) for every checked-in fixture of the given brands"""
+    found = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html.gz'))):
+        match = re.fullmatch(r'(.+)-(\d+)\.html\.gz', os.path.basename(path))
+        if not match or match.group(1) not in brands:
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            found.append((match.group(1), int(match.group(2)), f.read()))
+    return sorted(found, key=lambda item: (list(TILE_PARSERS).index(item[0]), item[1]))
+
+
+def best_time(config, html, repeat):
+    """Rows of a warm-up run and the best wall time over `repeat` more"""
+    rows = list(parse_tiles(config, html))
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        list(parse_tiles(config, html))
+        timings.append(time.perf_counter() - start)
+    return rows, min(timings)
+
+
+def measure(name, html, repeat):
+    """Best wall time over `repeat` runs against html.parser's, plus peak memory and blocks of one traced run"""
+    config = TILE_PARSERS[name]
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows, best = best_time(config, html, repeat)
+        # The same extraction the way it ran before parser and tile_scope, as the machine's yardstick
+        _, reference = best_time(replace(config, parser='html.parser', tile_scope=None), html, repeat)
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        traced_rows = list(parse_tiles(config, html))
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        del traced_rows
+
+    # Blocks still allocated at the end of the run: the rows plus the parse tree, which
+    # holds reference cycles and waits for the garbage collector
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return {
+        'rows': len(rows),
+        'seconds': round(best, 5),
+        'tiles_per_sec': round(len(rows) / best, 1) if best else 0.0,
+        'speedup': round(reference / best, 2) if best else 0.0,
+        'peak_kb': round(peak / 1024, 1),
+        'blocks': blocks,
+    }
+
+
+def regressions(result, baseline, memory_tolerance, speed_tolerance=None, compare_memory=True):
+    """What got worse; speed only counts with a speed_tolerance, memory only with compare_memory"""
+    problems = []
+    if result['rows'] != baseline['rows']:
+        problems.append(f"rows {baseline['rows']} -> {result['rows']}")
+    if compare_memory and result['peak_kb'] > baseline['peak_kb'] * (1 + memory_tolerance):
+        problems.append(f"peak {baseline['peak_kb']:.0f} KB -> {result['peak_kb']:.0f} KB")
+    if compare_memory and result['blocks'] > baseline['blocks'] * (1 + memory_tolerance):
+        problems.append(f"blocks {baseline['blocks']} -> {result['blocks']}")
+    if speed_tolerance is not None and 'speedup' in baseline and \
+            result['speedup'] < baseline['speedup'] * (1 - speed_tolerance):
+        problems.append(f"speed-up over html.parser {baseline['speedup']:.1f}x -> {result['speedup']:.1f}x")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--brand', action='append', choices=sorted(TILE_PARSERS), help='only this brand (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--gate-speed', action='store_true',
+                        help='also fail when the speed-up over html.parser drops more than the speed tolerance')
+    parser.add_argument('--speed-tolerance', type=float, default=SPEED_TOLERANCE,
+                        help='allowed relative drop in the speed-up over html.parser (default: %(default)s)')
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE,
+                        help='allowed relative growth in peak memory and blocks (default: %(default)s)')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--write-fixtures', action='store_true', help='regenerate the fixture pages and exit')
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures()
+        return
+
+    pages = fixtures(args.brand or list(TILE_PARSERS))
+    if not pages:
+        sys.exit(f"No fixtures in {FIXTURE_DIR}; run with --write-fixtures")
+
+    stored = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            stored = json.load(f)
+    baseline = stored.get('results', {})
+    # tracemalloc figures are exact, but differ between Python versions
+    same_python = stored.get('python', '').rsplit('.', 1)[0] == platform.python_version().rsplit('.', 1)[0]
+    if baseline and not same_python:
+        print(f"Baseline is from Python {stored.get('python')}; comparing rows only, not memory\n")
+
+    results = {}
+    failed = False
+    print(f"{'fixture':<20} {'rows':>5} {'ms':>9} {'tiles/s':>9} {'vs html':>8} {'peak KB':>9} {'blocks':>8}  "
+          f"vs baseline")
+    for name, tiles, html in pages:
+        key = f"{name}-{tiles}"
+        result = results[key] = measure(name, html, args.repeat)
+        previous = baseline.get(key)
+        if previous is None:
+            verdict = 'no baseline'
+        else:
+            problems = regressions(result, previous, args.memory_tolerance,
+                                   args.speed_tolerance if args.gate_speed else None, same_python)
+            change = result['speedup'] / previous['speedup'] - 1 if previous.get('speedup') else 0.0
+            verdict = f"{change:+.0%} relative speed" + (f"  REGRESSED: {', '.join(problems)}" if problems else '')
+            failed = failed or bool(problems)
+        print(f"{key:<20} {result['rows']:>5} {result['seconds'] * 1000:>9.1f} {result['tiles_per_sec']:>9.0f} "
+              f"{result['speedup']:>7.1f}x {result['peak_kb']:>9.0f} {result['blocks']:>8}  {verdict}")
+
+    if args.update_baseline:
+        baseline.update(results)
+        stored = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': dict(sorted(baseline.items())),
+        }
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2)
+            f.write('\n')
+        print(f"Baseline updated: {BASELINE_PATH}")
+        return
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
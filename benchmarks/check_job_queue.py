@@ -0,0 +1,162 @@
+"""Check the SQLite job queue with several worker processes on a local storefront.
+
+Registers fixture brands served by benchmarks/shopify_fixture.py (so jobs
+take the Shopify JSON route and no browser is needed), queues their
+collections and checks that:
+
+  - several `work` processes drain the queue with every job done once;
+  - a job whose worker died mid-scrape is claimed again once its lease runs
+    out, and completed by another worker on its second attempt;
+  - a brand whose circuit breaker opened in one run is scraped again by the
+    same long-lived worker in the next run.
+
+Uses its own state directory and queue; rows stay in the local history
+(SCRAPER_SHEETS_MIRROR=0). Exits non-zero if any check fails.
+
+Usage:
+    python benchmarks/check_job_queue.py [--workers 3] [--lease 2]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# Keep the queue, checkpoints and history of this run away from the real state directory
+os.environ['SCRAPER_STATE_DIR'] = tempfile.mkdtemp(prefix='check-queue-')
+os.environ['SCRAPER_SHEETS_MIRROR'] = '0'
+# A collection whose JSON fails must fail its job, not fall back to a browser
+os.environ['SCRAPER_FETCH_MODE'] = 'json'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import job_queue
+from benchmarks.check_shopify_fetcher import fixture_config
+from benchmarks.shopify_fixture import COLLECTIONS, serve
+from brands import BRANDS, Collection
+from local_state import state_path
+
+# Fixture brand -> storefront handles of its collections
+FIXTURE_BRANDS = {
+    'fixture_a': ['bestsellers', 'new-arrivals', 'sale'],
+    'fixture_b': ['bestsellers', 'sale'],
+    'fixture_c': ['new-arrivals', 'sale', 'bestsellers'],
+}
+
+
+def register(base, name, handles):
+    """Add a fixture brand to BRANDS, with collections named <brand>_<n>"""
+    config = fixture_config(base, handles)
+    config.name = config.brand = name
+    config.collections = [Collection(f"{name}_{n}", c.url) for n, c in enumerate(config.collections)]
+    BRANDS[name] = config
+    return {c.name: COLLECTIONS.get(handle, 0) for c, handle in zip(config.collections, handles)}
+
+
+def report(label, ok, detail=''):
+    print(f"{label:<58} {'ok' if ok else 'FAILED'}  {detail}")
+    return ok
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def run_worker(path, lease, worker):
+    queue = job_queue.JobQueue(path, lease_seconds=lease, domain_interval=0)
+    quiet(job_queue.work, queue, worker, exit_when_empty=True)
+
+
+def crash_after_claim(path, lease):
+    """Claim a job and die without completing it, as a killed worker would"""
+    job = job_queue.JobQueue(path, lease_seconds=lease, domain_interval=0).claim('doomed')
+    print(f"doomed worker claimed {job.collection} and died")
+    os._exit(0)
+
+
+def check_workers(base, workers, lease):
+    path = state_path('queue-workers.sqlite')
+    queue = job_queue.JobQueue(path, lease_seconds=lease, domain_interval=0)
+    expected = {}
+    for name, handles in FIXTURE_BRANDS.items():
+        expected.update(register(base, name, handles))
+    quiet(job_queue.enqueue, list(FIXTURE_BRANDS), 'workers', queue)
+
+    # Forked, so the workers see the fixture brands registered above
+    context = multiprocessing.get_context('fork')
+    doomed = context.Process(target=crash_after_claim, args=(path, lease))
+    doomed.start()
+    doomed.join()
+
+    start = time.perf_counter()
+    processes = [context.Process(target=run_worker, args=(path, lease, f"worker-{n}")) for n in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    jobs = queue.jobs('workers')
+    done = [job for job in jobs if job['status'] == job_queue.DONE]
+    reclaimed = [job for job in jobs if job['attempts'] > 1]
+    results = {job['collection']: job_queue.json.loads(job['result'] or 'null') for job in done}
+    return [
+        report('workers: every job done', len(done) == len(jobs) == len(expected),
+               f"{len(done)}/{len(jobs)} in {elapsed:.1f}s"),
+        report('workers: rows of every collection',
+               all(results.get(name) == {name: rows} for name, rows in expected.items())),
+        report('workers: jobs spread over several workers', len({job['worker'] for job in done}) > 1,
+               ', '.join(sorted({job['worker'] for job in done}))),
+        report('lease: dead worker\'s job claimed again after the lease',
+               len(reclaimed) == 1 and reclaimed[0]['attempts'] == 2 and reclaimed[0]['worker'] != 'doomed',
+               f"{reclaimed[0]['collection']} done by {reclaimed[0]['worker']}" if reclaimed else 'no job reclaimed'),
+        report('lease: no job left leased', not [job for job in jobs if job['status'] == job_queue.LEASED]),
+    ]
+
+
+def check_breaker_across_runs(base, lease):
+    """One worker process runs a brand that fails in its first run and works in the next"""
+    path = state_path('queue-breaker.sqlite')
+    queue = job_queue.JobQueue(path, lease_seconds=lease, domain_interval=0)
+    register(base, 'fixture_flip', ['missing'] * 4)
+    quiet(job_queue.enqueue, ['fixture_flip'], 'broken', queue)
+    quiet(job_queue.work, queue, 'long-lived', exit_when_empty=True)
+    broken = queue.jobs('broken')
+    opened = [job for job in broken if 'skipped after' in (job['error'] or '')]
+
+    register(base, 'fixture_flip', ['sale'] * 4)
+    quiet(job_queue.enqueue, ['fixture_flip'], 'fixed', queue)
+    quiet(job_queue.work, queue, 'long-lived', exit_when_empty=True)
+    fixed = queue.jobs('fixed')
+    return [
+        report('breaker: opens within a run', opened != [] and all(j['status'] == job_queue.FAILED for j in broken),
+               f"{len(opened)} of {len(broken)} jobs skipped"),
+        report('breaker: next run on the same worker starts closed',
+               all(job['status'] == job_queue.DONE for job in fixed),
+               f"{sum(job['status'] == job_queue.DONE for job in fixed)}/{len(fixed)} done"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--lease', type=float, default=2.0, help='lease seconds (short, so the reclaim is quick)')
+    args = parser.parse_args()
+
+    # Workers sleep this long when every queued job is leased by someone else
+    job_queue.POLL_SECONDS = min(job_queue.POLL_SECONDS, args.lease)
+    server = serve()
+    try:
+        results = check_workers(server.url, args.workers, args.lease)
+        results += check_breaker_across_runs(server.url, args.lease)
+    finally:
+        server.shutdown()
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Check that each brand's configured parser produces the same rows as html.parser.
+
+Runs every brand's tile extraction twice over the same page, once with the
+original full-document html.parser tree and once with the brand's parser
+and tile_scope from brands.py, and reports the speed-up and any row differences. Exits
+non-zero if any brand's output changes.
+
+Usage:
+    python benchmarks/check_parser_parity.py [--tiles 300]
+    python benchmarks/check_parser_parity.py --brand vuori saved_page.html ...
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_pages import PAGES
+from brands import find_collection
+from scrape_engine import parse_tiles
+
+# Fixture name -> config of the collection it was recorded from
+TILE_PARSERS = {
+    name: find_collection(collection)[0]
+    for name, collection in [
+        ('alo', 'alo'),
+        ('alo_new', 'alo_new'),
+        ('lululemon', 'lululemon_new'),
+        ('vuori', 'vuori'),
+        ('beyond_yoga', 'beyond_yoga'),
+        ('athleta', 'athleta'),
+    ]
+}
+
+
+def timed(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        rows = list(fn(*args, **kwargs))
+        return time.perf_counter() - start, rows
+
+
+def check(label, html, name):
+    config = TILE_PARSERS[name]
+    base_time, expected = timed(parse_tiles, replace(config, parser='html.parser', tile_scope=None), html)
+    fast_time, actual = timed(parse_tiles, config, html)
+    ok = expected == actual
+    print(f"{label:<26} {config.parser:<11} scope={str(config.tile_scope):<32} "
+          f"{base_time * 1000:8.1f} -> {fast_time * 1000:7.1f} ms  "
+          f"{len(actual)} rows  {'identical' if ok else 'DIFFERENT'}")
+    if not ok:
+        for i, (want, got) in enumerate(zip(expected, actual)):
+            if want != got:
+                print(f"  first difference at row {i + 1}:\n    expected {want}\n    got      {got}")
+                break
+        else:
+            print(f"  row counts differ: expected {len(expected)}, got {len(actual)}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help='recorded HTML pages to check instead of the synthetic fixtures')
+    parser.add_argument('--brand', choices=sorted(TILE_PARSERS), help='brand of the recorded pages')
+    parser.add_argument('--tiles', type=int, default=300)
+    args = parser.parse_args()
+
+    results = []
+    if args.pages:
+        if not args.brand:
+            parser.error('--brand is required with recorded pages')
+        for path in args.pages:
+            with open(path, encoding='utf-8') as f:
+                results.append(check(os.path.basename(path), f.read(), args.brand))
+    else:
+        for name in TILE_PARSERS:
+            results.append(check(f"{name} ({args.tiles} tiles)", PAGES[name](args.tiles), name))
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
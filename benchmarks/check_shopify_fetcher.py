@@ -0,0 +1,165 @@
+"""Check the Shopify JSON route against a local stand-in storefront.
+
+Starts benchmarks/shopify_fixture.py on localhost and checks that
+shopify_fetcher follows the products.json pages to the end (including a
+collection that ends exactly on a page boundary), maps the records to rows,
+turns 404s, challenge pages, empty and failing responses into
+ShopifyFetchError, and that scrape_engine.run_without_browser() falls back to
+the browser for them unless SCRAPER_FETCH_MODE=json. Exits non-zero if any
+check fails. No browser or network access is needed.
+
+Usage:
+    python benchmarks/check_shopify_fetcher.py
+    python benchmarks/check_shopify_fetcher.py --recorded saved_responses/   # <handle>-<page>.json files
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+# Keep the checkpoints of this run away from the real state directory
+os.environ['SCRAPER_STATE_DIR'] = tempfile.mkdtemp(prefix='check-shopify-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape_engine
+from benchmarks.shopify_fixture import COLLECTIONS, MAX_LIMIT, serve
+from brands import BrandConfig, Collection, Field
+from shopify_fetcher import PAGE_LIMIT, ShopifyFetchError, fetch_collection_products, product_rows
+
+
+class ListSink:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, sheet_name, rows):
+        self.rows[sheet_name] = rows
+
+    def flush(self):
+        return 0
+
+
+def fixture_config(base, handles):
+    return BrandConfig(
+        name='fixture',
+        brand='fixture',
+        collections=[Collection(f"fixture_{handle}", f"{base}/collections/{handle}") for handle in handles],
+        site_url=base,
+        tile_selector='.tile',
+        popup_selectors=[],
+        shopify=True,
+        fields={'Product Name': Field(['.name'])},
+    )
+
+
+@contextlib.contextmanager
+def fetch_mode(mode):
+    # scrape_engine reads SCRAPER_FETCH_MODE once, at import
+    previous, scrape_engine.FETCH_MODE = scrape_engine.FETCH_MODE, mode
+    try:
+        yield
+    finally:
+        scrape_engine.FETCH_MODE = previous
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def report(label, ok, detail=''):
+    print(f"{label:<50} {'ok' if ok else 'FAILED'}  {detail}")
+    return ok
+
+
+def check_pagination(server, handle):
+    del server.requests[:]
+    products = fetch_collection_products(f"{server.url}/collections/{handle}")
+    pages = [page for name, page, limit in server.requests if name == handle]
+    limits = {limit for name, page, limit in server.requests}
+    expected_pages = COLLECTIONS[handle] // PAGE_LIMIT + 1
+    ok = (len(products) == COLLECTIONS[handle] and pages == list(range(1, expected_pages + 1))
+          and limits == {min(PAGE_LIMIT, MAX_LIMIT)} and len({p['handle'] for p in products}) == len(products))
+    return report(f"pagination: {handle}", ok, f"{len(products)} products over pages {pages}")
+
+
+def check_rows(server):
+    records = fetch_collection_products(f"{server.url}/collections/sale")
+    rows = product_rows(records, 'fixture', server.url)
+    # Record 0 has no images and a .50 price, record 1 a whole price and images
+    ok = (
+        [row.index for row in rows] == list(range(1, len(rows) + 1))
+        and rows[1].name == records[1]['title'].strip()
+        and (rows[0].price, rows[1].price) == ('$38.50', '$58')
+        and rows[1].url == f"{server.url}/products/{records[1]['handle']}"
+        and rows[0].image_url == ''
+        and rows[1].image_url == 'https:' + records[1]['images'][0]['src']
+    )
+    return report('rows: names, lowest prices, URLs and images', ok, f"{len(rows)} rows")
+
+
+def check_error(server, handle):
+    try:
+        fetch_collection_products(f"{server.url}/collections/{handle}")
+    except ShopifyFetchError as e:
+        return report(f"error: {handle}", True, str(e).split(': ', 1)[-1][:60])
+    return report(f"error: {handle}", False, 'no ShopifyFetchError raised')
+
+
+def check_engine(server):
+    results = []
+    sink = ListSink()
+    rows = quiet(scrape_engine.run_without_browser, fixture_config(server.url, ['bestsellers', 'new-arrivals']), sink)
+    counts = {name: len(r) for name, r in (rows or {}).items()}
+    results.append(report('engine: JSON route without a browser',
+                          counts == {'fixture_bestsellers': 620, 'fixture_new-arrivals': 500}
+                          and {name: len(r) for name, r in sink.rows.items()} == counts, str(counts)))
+
+    for handle in ['missing', 'blocked', 'flaky']:
+        fallback = quiet(scrape_engine.run_without_browser, fixture_config(server.url, ['sale', handle]), ListSink())
+        results.append(report(f"engine: falls back to the browser on {handle}", fallback is None))
+
+    with fetch_mode('json'):
+        try:
+            quiet(scrape_engine.run_without_browser, fixture_config(server.url, ['missing']), ListSink())
+            raised = False
+        except ShopifyFetchError:
+            raised = True
+    results.append(report('engine: SCRAPER_FETCH_MODE=json raises instead', raised))
+
+    del server.requests[:]
+    with fetch_mode('browser'):
+        skipped = quiet(scrape_engine.run_without_browser, fixture_config(server.url, ['sale']), ListSink())
+    results.append(report('engine: SCRAPER_FETCH_MODE=browser skips the JSON',
+                          skipped is None and not server.requests))
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recorded', help='directory of recorded products.json responses to serve')
+    args = parser.parse_args()
+
+    server = serve(args.recorded)
+    try:
+        if args.recorded:
+            handles = sorted({name.rsplit('-', 1)[0] for name in os.listdir(args.recorded) if name.endswith('.json')})
+            results = []
+            for handle in handles:
+                products = fetch_collection_products(f"{server.url}/collections/{handle}")
+                rows = product_rows(products, 'recorded', server.url)
+                results.append(report(f"recorded: {handle}", len(rows) == len(products) > 0, f"{len(rows)} rows"))
+        else:
+            results = [check_pagination(server, handle) for handle in ['bestsellers', 'new-arrivals', 'sale']]
+            results.append(check_rows(server))
+            results += [check_error(server, handle) for handle in ['missing', 'blocked', 'empty', 'flaky']]
+            results.append(check_engine(server))
+    finally:
+        server.shutdown()
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
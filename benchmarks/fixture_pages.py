@@ -0,0 +1,161 @@
+"""Synthetic listing pages shaped like the recorded storefront markup.
+
+Each builder returns a full HTML document with `count` product tiles, the
+surrounding page chrome and, where the real site ships one, the embedded
+hydration state that lists the same products.
+"""
+import json
+
+STYLES = ["Align", "Define", "Swiftly", "Wunder", "Scuba", "Hotty Hot", "Ebb", "Dance Studio"]
+KINDS = ["High-Rise Pant", "Jacket", "Tech Short-Sleeve", "Train Tight", "Hoodie", "Short", "Tank", "Jogger"]
+PRICES = [38, 58, 68, 78, 88, 98, 118, 128, 148]
+
+CHROME = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title>
+{head}
+</head><body>
+<header class="site-header"><nav>{nav}</nav></header>
+<main><div class="product-grid">
+{tiles}
+</div></main>
+<footer>{footer}</footer>
+{scripts}
+</body></html>"""
+
+
+def _products(count):
+    for i in range(count):
+        yield {
+            'i': i,
+            'name': f"{STYLES[i % len(STYLES)]} {KINDS[(i // len(STYLES)) % len(KINDS)]} {i // 64 + 1}",
+            'price': PRICES[i % len(PRICES)],
+            'sku': f"LW{500000 + i}",
+        }
+
+
+def _chrome(title, tiles, scripts='', head=''):
+    nav = ''.join(f'<a class="nav-link" href="/c/{n}">{n}</a>' for n in ['women', 'men', 'accessories', 'sale'] * 30)
+    footer = ''.join(f'<p class="legal">Footer link {n}</p>' for n in range(120))
+    analytics = ''.join(f'<script src="https://cdn.example.com/tag{n}.js"></script>' for n in range(20))
+    return CHROME.format(title=title, head=head + analytics, nav=nav, tiles=tiles, footer=footer, scripts=scripts)
+
+
+def lululemon_page(count):
+    tiles, state = [], []
+    for p in _products(count):
+        path = f"/p/women-pants/{p['name'].replace(' ', '-')}/_/prod{p['sku']}"
+        image = f"https://images.lululemon.com/is/image/lululemon/{p['sku']}_0001_1"
+        tiles.append(
+            f'<div class="product-tile" data-testid="product-tile">'
+            f'<a class="product-tile__image-link" href="{path}">'
+            f'<img srcset="{image}?wid=320 320w, {image}?wid=640 640w" alt="{p["name"]}" loading="lazy"></a>'
+            f'<div class="product-tile__details"><h3 class="product-tile__product-name">'
+            f'<a href="{path}">{p["name"]}</a></h3>'
+            f'<span class="price"><span class="price-1jnQj">${p["price"]}</span></span>'
+            f'<div class="swatches">' + ''.join(f'<button class="swatch" aria-label="colour {n}"></button>' for n in range(6)) +
+            '</div></div></div>'
+        )
+        state.append({
+            'productId': p['sku'], 'displayName': p['name'], 'listPrice': str(p['price']),
+            'pdpUrl': path, 'skuImages': [f"{image}?wid=320"], 'swatches': [{'colorId': n} for n in range(6)],
+        })
+    next_data = {'props': {'pageProps': {'initialState': {'category': {'name': 'Whats New', 'products': state}}}}}
+    script = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>'
+    return _chrome("What's New | lululemon", '\n'.join(tiles), scripts=script)
+
+
+def athleta_page(count):
+    tiles, state = [], []
+    for p in _products(count):
+        path = f"/browse/product.do?pid={p['sku']}&cid=1006482"
+        image = f"/webcontent/0050/{p['sku']}.jpg"
+        tiles.append(
+            f'<div class="product-card" data-testid="product-card">'
+            f'<a href="{path}"><img src="{image}" alt="{p["name"]}"></a>'
+            f'<div class="sitewide-1evqbfz">{p["name"]}</div>'
+            f'<div class="product-card-price"><span>${p["price"]}.00</span></div>'
+            f'</div>'
+        )
+        state.append({
+            'pid': p['sku'], 'name': p['name'], 'price': {'regular': f"${p['price']}.00"},
+            'url': path, 'image': {'path': f"https://athleta.gap.com{image}"},
+        })
+    preloaded = {'productGrid': {'total': count, 'products': state}}
+    script = f'<script>window.__PRELOADED_STATE__ = {json.dumps(preloaded)};</script>'
+    return _chrome("New Arrivals | Athleta", '\n'.join(tiles), scripts=script)
+
+
+def _alo_tile(p, image_html):
+    path = f"/products/{p['name'].lower().replace(' ', '-')}"
+    return (
+        f'<div class="PlpTile" data-product-id="{p["sku"]}">'
+        f'<div class="product-carousel">{image_html}</div>'
+        f'<div class="product-details"><div class="product-name"><a href="{path}">{p["name"]}</a></div>'
+        f'<div class="card-price"><span class="product-price">${p["price"]}</span></div>'
+        f'<ul class="swatch-list">' + ''.join(f'<li class="swatch"><a href="{path}?color={n}">c{n}</a></li>' for n in range(5)) +
+        '</ul></div></div>'
+    )
+
+
+def alo_page(count):
+    tiles = []
+    for p in _products(count):
+        image = f"https://cdn.shopify.com/s/files/1/2185/2813/products/{p['sku']}_BLACK_1.jpg?v=1700000000"
+        tiles.append(_alo_tile(p, f'<img class="normal" src="{image}" alt="{p["name"]}"><img class="hover" data-src="{image}&hover=1">'))
+    return _chrome("Bestsellers | Alo Yoga", '\n'.join(tiles))
+
+
+def alo_new_page(count):
+    tiles = []
+    for p in _products(count):
+        image = f"//cdn.shopify.com/s/files/1/2185/2813/products/{p['sku']}_BLACK_1.jpg?v=1700000000"
+        slides = ''.join(
+            f'<div class="swiper-slide"><img class="scrollable-image{" loaded" if n == 0 else ""}" src="{image}&slide={n}"></div>'
+            for n in range(3)
+        )
+        tiles.append(_alo_tile(p, f'<div class="swiper-wrapper">{slides}</div>'))
+    return _chrome("New Arrivals | Alo Yoga", '\n'.join(tiles))
+
+
+def vuori_page(count):
+    tiles = []
+    for p in _products(count):
+        path = f"/products/{p['name'].lower().replace(' ', '-')}"
+        image = f"https://vuoriclothing.com/cdn/shop/files/{p['sku']}_1.jpg?v=1700000000&width=600"
+        tiles.append(
+            f'<div class="MuiGrid-root MuiGrid-item"><div class="MuiBox-root mui-style-0">'
+            f'<a href="{path}"><img src="{image}" alt="{p["name"]}"></a>'
+            f'<div class="MuiBox-root mui-style-1k2jzr4">'
+            f'<p class="MuiTypography-root MuiTypography-body1" data-product-name="{p["name"]}" data-product-path="{path}">{p["name"]}</p>'
+            f'<p class="MuiTypography-root MuiTypography-body2">Black Heather</p>'
+            f'<p class="MuiTypography-root MuiTypography-body2">${p["price"]}</p>'
+            f'</div></div></div>'
+        )
+    return _chrome("Women's New Arrivals | Vuori", '\n'.join(tiles))
+
+
+def beyond_yoga_page(count):
+    tiles = []
+    for p in _products(count):
+        path = f"/collections/new-arrivals/products/{p['name'].lower().replace(' ', '-')}"
+        image = f"//beyondyoga.com/cdn/shop/files/{p['sku']}_BLK_1.jpg?v=1700000000"
+        srcset = ', '.join(f"{image}&width={w} {w}w" for w in (360, 540, 720, 1080))
+        tiles.append(
+            f'<li class="collection-grid__grid-item"><div class="product-card">'
+            f'<picture class="lazypicture"><source srcset="{srcset}"><img srcset="{srcset}" src="{image}&width=360" alt="{p["name"]}"></picture>'
+            f'<a class="product-card__info-wrapper" href="{path}">'
+            f'<h3 class="product-card__title">{p["name"]}</h3>'
+            f'<div class="price"><span class="price-item price-item--regular">${p["price"]}</span></div>'
+            f'</a></div></li>'
+        )
+    return _chrome("New Arrivals | Beyond Yoga", '\n'.join(tiles))
+
+
+PAGES = {
+    'alo': alo_page,
+    'alo_new': alo_new_page,
+    'lululemon': lululemon_page,
+    'vuori': vuori_page,
+    'beyond_yoga': beyond_yoga_page,
+    'athleta': athleta_page,
+}
@@ -0,0 +1,105 @@
+"""Local stand-in for a Shopify storefront's collection JSON.
+
+Serves /collections/<handle>/products.json with the `limit` and `page`
+parameters the real endpoint takes, from product records shaped like the
+recorded storefront responses (title, handle, variants with string prices,
+protocol-relative image URLs). A directory of recorded responses, saved as
+<handle>-<page>.json, can be served instead of the generated records.
+
+Some handles misbehave on purpose, to exercise the fallback to the browser:
+    missing   404 Not Found
+    blocked   an HTML challenge page with status 200
+    empty     a valid response without products
+    flaky     503 on the second page
+"""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixture_pages import KINDS, PRICES, STYLES
+
+# Products per generated collection; 500 ends exactly on a page boundary of the fetcher's limit
+COLLECTIONS = {'bestsellers': 620, 'new-arrivals': 500, 'sale': 12, 'flaky': 400}
+MAX_LIMIT = 250
+
+
+def product(handle, i):
+    price = PRICES[i % len(PRICES)]
+    name = f"{STYLES[i % len(STYLES)]} {KINDS[(i // len(STYLES)) % len(KINDS)]}"
+    slug = f"{handle}-{name.lower().replace(' ', '-')}-{i}"
+    return {
+        'id': 7000000000 + i,
+        'title': f" {name} {i} ",
+        'handle': slug,
+        'vendor': 'Fixture',
+        'product_type': KINDS[(i // len(STYLES)) % len(KINDS)],
+        # Sizes can differ in price; the row shows the lowest, as the storefront does
+        'variants': [
+            {'id': 40000000000 + i * 10 + n, 'title': size, 'price': f"{price + 10 * (n == 3)}.{'50' if i % 7 == 0 else '00'}",
+             'compare_at_price': None, 'available': n != 1}
+            for n, size in enumerate(['XS', 'S', 'M', 'L'])
+        ],
+        'images': [
+            {'id': 30000000000 + i * 10 + n, 'position': n + 1,
+             'src': f"//cdn.shopify.com/s/files/1/0000/0001/products/{slug}-{n}.jpg?v=1700000000"}
+            for n in range(3 if i % 11 else 0)
+        ],
+    }
+
+
+def products_page(handle, page, limit):
+    total = COLLECTIONS.get(handle, 0)
+    start = (page - 1) * limit
+    return [product(handle, i) for i in range(start, min(start + limit, total))]
+
+
+class ShopifyHandler(BaseHTTPRequestHandler):
+    recorded = None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        segments = parts.path.strip('/').split('/')
+        if len(segments) != 3 or segments[0] != 'collections' or segments[2] != 'products.json':
+            return self.reply(404, 'text/plain', b'Not Found')
+        handle = segments[1]
+        limit = min(int(query.get('limit', ['30'])[0]), MAX_LIMIT)
+        page = int(query.get('page', ['1'])[0])
+        self.server.requests.append((handle, page, limit))
+
+        if handle == 'missing':
+            return self.reply(404, 'text/plain', b'Not Found')
+        if handle == 'blocked':
+            return self.reply(200, 'text/html', b'<html><body>Checking your browser...</body></html>')
+        if handle == 'flaky' and page == 2:
+            return self.reply(503, 'text/plain', b'Service Unavailable')
+        if self.recorded:
+            path = os.path.join(self.recorded, f"{handle}-{page}.json")
+            if not os.path.exists(path):
+                return self.reply(200, 'application/json', b'{"products": []}')
+            with open(path, 'rb') as f:
+                return self.reply(200, 'application/json', f.read())
+        body = json.dumps({'products': products_page(handle, page, limit)}).encode()
+        self.reply(200, 'application/json', body)
+
+    def reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(recorded=None):
+    """Start the fixture storefront in a background thread; returns the server (base URL in server.url)"""
+    handler = type('Handler', (ShopifyHandler,), {'recorded': recorded})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,211 @@
+"""Per-brand scraping configuration.
+
+Every brand is one BrandConfig entry: its collections, how to get the page
+ready (load wait, popups), which elements are product tiles and how each
+column is read from a tile. scrape_engine.py runs any entry, so adding a
+brand is a new entry in BRANDS and adding a collection is a new Collection.
+"""
+from dataclasses import dataclass, field, replace
+
+from popups import ALO_OVERLAYS, COMMON_CLOSE_BUTTONS
+
+
+@dataclass
+class Field:
+    """How one column is read from a product tile.
+
+    The selectors are tried in order and the first element with a usable
+    value wins. `attrs` are tried in order on that element (text content
+    when empty). srcset values are reduced to their first or last URL.
+    """
+    selectors: list
+    attrs: tuple = ()
+    default: str = "Unknown"
+    # Only accept elements whose text contains this
+    contains: str = None
+    # "first" or "last" entry of a srcset attribute
+    srcset: str = "first"
+    # Prefix relative URLs with the site URL ("//" becomes "https://" either way)
+    absolute: bool = False
+    strip_query: bool = False
+    # Look in the tile's ancestors when the tile itself has no match
+    search_parents: bool = False
+    # Skip the tile when nothing matches
+    required: bool = False
+
+
+@dataclass
+class Collection:
+    """One listing of a brand; its name is also its worksheet"""
+    name: str
+    url: str
+    # Follow ?page=2, 3, ... (see BrandConfig.page_param) up to this many pages
+    max_pages: int = 1
+    # Field rules that differ from the brand's
+    fields: dict = field(default_factory=dict)
+
+
+@dataclass
+class BrandConfig:
+    name: str
+    brand: str
+    collections: list
+    site_url: str
+    tile_selector: str
+    fields: dict
+    popup_selectors: list = field(default_factory=lambda: list(COMMON_CLOSE_BUTTONS))
+    # "refresh" after closing a popup, or "click_outside" when no close button matched
+    popup_fallback: str = None
+    load_wait: float = 5
+    # Later pages in the same session load from a warm cache with consent already given
+    next_load_wait: float = 2
+    page_param: str = "page"
+    parser: str = "lxml"
+    # Restrict the soup to the tiles (None parses the whole page)
+    tile_scope: str = None
+    # Tiles without at least this many matches of a selector are skipped
+    tile_requires: dict = field(default_factory=dict)
+    # Read the hydration state before falling back to rendered tiles
+    page_state: bool = False
+    # Try the Shopify collection JSON before starting a browser
+    shopify: bool = False
+    block_allow: list = field(default_factory=list)
+    # "selenium", or "cdp" for the asyncio DevTools engine (cdp_engine.py)
+    engine: str = "selenium"
+
+    def select(self, names=None):
+        """The brand's collections, or only those named"""
+        return [c for c in self.collections if names is None or c.name in names]
+
+    def for_collection(self, collection):
+        """This config with the collection's field overrides applied"""
+        if not collection.fields:
+            return self
+        return replace(self, fields={**self.fields, **collection.fields})
+
+
+BRANDS = {config.name: config for config in [
+    BrandConfig(
+        name="alo",
+        brand="alo yoga",
+        collections=[
+            Collection("alo", "https://www.aloyoga.com/collections/bestsellers", fields={
+                # The bestsellers grid still uses the older carousel markup
+                'Image URL': Field(
+                    ['.product-carousel img.normal', '.quick-add-carousel-images img',
+                     'img[class*="normal"]', 'img[src*="cdn.shopify.com"]'],
+                    attrs=('src',), default="Image not found",
+                ),
+            }),
+            Collection("alo_new", "https://www.aloyoga.com/collections/new-arrivals"),
+        ],
+        site_url="https://www.aloyoga.com",
+        tile_selector=".PlpTile",
+        tile_scope=".PlpTile",
+        popup_selectors=ALO_OVERLAYS,
+        popup_fallback="refresh",
+        shopify=True,
+        # The image selector needs the "loaded" class, which is only added once the image body arrives
+        block_allow=["image"],
+        fields={
+            'Product Name': Field(['.product-name a'], default="Name not found"),
+            'Price': Field(['.card-price .product-price'], default="Price not found"),
+            'URL': Field(['.product-name a', 'a'], attrs=('href',), default="URL not found", absolute=True),
+            'Image URL': Field(['.swiper-slide img.scrollable-image.loaded'], attrs=('src',),
+                               default="Image not found", absolute=True),
+        },
+    ),
+    BrandConfig(
+        name="lululemon",
+        brand="lululemon",
+        collections=[
+            Collection("lululemon", "https://shop.lululemon.com/c/women-bestsellers/n16o10znskl"),
+            Collection("lululemon_new", "http://shop.lululemon.com/c/women-whats-new/n16o10zq0cf"),
+        ],
+        site_url="https://shop.lululemon.com",
+        tile_selector="div.product-tile",
+        tile_scope="div.product-tile",
+        page_state=True,
+        load_wait=10,
+        fields={
+            'Product Name': Field(['h3.product-tile__product-name']),
+            'Price': Field(['span.price']),
+            'URL': Field(['a.product-tile__image-link'], attrs=('href',), absolute=True),
+            'Image URL': Field(['img'], attrs=('srcset',), default=""),
+        },
+    ),
+    BrandConfig(
+        name="vuori",
+        brand="vuori",
+        collections=[Collection("vuori", "https://vuoriclothing.com/collections/womens-new")],
+        site_url="https://vuoriclothing.com",
+        tile_selector="div.MuiBox-root.mui-style-0",
+        # Images can sit outside the tile, so the whole page is parsed
+        tile_scope=None,
+        popup_selectors=COMMON_CLOSE_BUTTONS + [
+            ("click", "//button[@data-testid='close-button']"),
+        ],
+        shopify=True,
+        # Name/colour and price are separate body2 paragraphs
+        tile_requires={'p.MuiTypography-root.MuiTypography-body2': 2},
+        fields={
+            'Product Name': Field(['p[data-product-name]'], attrs=('data-product-name',), required=True),
+            'Price': Field(['p.MuiTypography-root.MuiTypography-body2'], contains='$'),
+            'URL': Field(['p[data-product-name]'], attrs=('data-product-path',), absolute=True),
+            'Image URL': Field(['img'], attrs=('src',), default="", strip_query=True, search_parents=True),
+        },
+    ),
+    BrandConfig(
+        name="beyond_yoga",
+        brand="beyond yoga",
+        collections=[Collection("beyond_yoga", "https://beyondyoga.com/collections/new-arrivals")],
+        site_url="https://beyondyoga.com",
+        tile_selector="li.collection-grid__grid-item",
+        tile_scope="li.collection-grid__grid-item",
+        popup_selectors=COMMON_CLOSE_BUTTONS + [
+            ("click", "//button[@aria-label='Close dialog']"),
+        ],
+        shopify=True,
+        fields={
+            'Product Name': Field(['.product-card__title']),
+            'Price': Field(['.price-item--regular']),
+            'URL': Field(['a.product-card__info-wrapper'], attrs=('href',), absolute=True),
+            # Largest rendition in the srcset
+            'Image URL': Field(['picture.lazypicture img'], attrs=('srcset', 'src'), srcset="last", default=""),
+        },
+    ),
+    BrandConfig(
+        name="athleta",
+        brand="athleta",
+        collections=[Collection(
+            "athleta",
+            "https://athleta.gap.com/browse/new/all-new-arrivals?cid=1006482&mlink=1%2C1%2CMeganav_1&nav=meganav%3ANew%3A%3A",
+        )],
+        site_url="https://athleta.gap.com",
+        tile_selector=".product-card",
+        tile_scope=".product-card",
+        popup_selectors=COMMON_CLOSE_BUTTONS + [
+            ("click", "//button[contains(@aria-label, 'Dismiss this popup')]"),
+            ("click", "//button[@aria-label='Close']"),
+            ("click", "//span[@class='close-button']"),
+        ],
+        popup_fallback="click_outside",
+        load_wait=10,
+        page_state=True,
+        fields={
+            'Product Name': Field(['.sitewide-1evqbfz']),
+            'Price': Field(['.product-card-price span, [class*="price"]']),
+            'URL': Field(['a[href*="/browse/product.do"]'], attrs=('href',), absolute=True),
+            'Image URL': Field(['img[src*="/webcontent/"]'], attrs=('src',), default="", absolute=True),
+        },
+    ),
+]}
+
+
+def find_collection(name):
+    """(brand config with the collection's overrides, collection) for a collection name"""
+    for config in BRANDS.values():
+        for collection in config.collections:
+            if collection.name == name:
+                return config.for_collection(collection), collection
+    raise KeyError(name)
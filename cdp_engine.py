@@ -0,0 +1,595 @@
+"""asyncio browser engine that drives Chrome over the DevTools protocol (CDP).
+
+Every Selenium call blocks its thread while Chrome waits for lazy-loaded
+tiles. This engine keeps one Chrome per process and drives it from a
+background asyncio loop instead: each collection of a brand loads in its
+own tab at the same time, so their load waits and scroll settling overlap,
+and brands run from several threads share the same loop and browser. Each
+brand gets a fresh browser context (its own cookies and storage), as
+reset_driver() gives the Selenium pool.
+
+Pages are prepared like scrape_engine.scrape() (same popup and scroll
+scripts, network blocking, phase deadlines and page state shortcut) and the
+rows come from the same parse_page(), checkpoints and upload_collections(),
+so brands move over one at a time with engine="cdp" in brands.py.
+SCRAPER_ENGINE=cdp (or selenium) overrides every brand.
+
+Chrome is found through CHROME_BINARY or the PATH. CHROME_CDP_URL
+(ws://host:port/devtools/browser/<id>) connects to a Chrome that is already
+running instead.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import (AcceptConnection, CloseConnection, Message, Ping, RejectConnection, Request,
+                            TextMessage)
+
+import scrape_engine
+from checkpoints import CAPTURED, EXTRACTED, Checkpoint
+from delta import product_key
+from driver_pool import STEALTH_SCRIPT, chrome_options
+from network_profile import blocked_patterns
+from page_state import extract_products
+from popups import DISMISS_SCRIPT, report_matches, selector_order
+from run_metrics import attached, current, phase
+from scroll_engine import SCROLL_STEP_SCRIPT, ScrollProgress
+from supervision import GRACE, PHASE_DEADLINES, DeadlineExceeded
+
+ENGINE = os.environ.get('SCRAPER_ENGINE')
+CHROME_BINARY = os.environ.get('CHROME_BINARY')
+CDP_URL = os.environ.get('CHROME_CDP_URL')
+CHROME_NAMES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+MAC_CHROME = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+# Tabs of one brand load side by side, so none of them may be throttled as a background tab
+CHROME_FLAGS = [
+    '--remote-debugging-port=0',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+STARTUP_SECONDS = 30
+READ_CHUNK = 1 << 16
+
+
+class CDPError(Exception):
+    """Chrome answered a command with an error"""
+
+
+class NavigationError(ConnectionError):
+    """A page could not be loaded (DNS, connection refused, ...); retried like other connection errors"""
+
+
+def uses_cdp(config):
+    return (ENGINE or config.engine) == 'cdp'
+
+
+def chrome_binary():
+    if CHROME_BINARY:
+        return CHROME_BINARY
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    if sys.platform == 'darwin' and os.path.exists(MAC_CHROME):
+        return MAC_CHROME
+    raise FileNotFoundError("Chrome not found; set CHROME_BINARY")
+
+
+class Connection:
+    """One DevTools websocket, shared by every tab through flattened sessions"""
+
+    def __init__(self, reader, writer, ws):
+        self._reader = reader
+        self._writer = writer
+        self._ws = ws
+        self._ids = itertools.count(1)
+        # id -> (method, session, future)
+        self._pending = {}
+        # [method, session, future] waiting for the next matching event
+        self._waiters = []
+        self._task = None
+        self.closed = False
+
+    @classmethod
+    async def open(cls, url):
+        parts = urlsplit(url)
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        ws = WSConnection(ConnectionType.CLIENT)
+        writer.write(ws.send(Request(host=parts.netloc, target=parts.path or '/')))
+        await writer.drain()
+        connection = cls(reader, writer, ws)
+        await connection._handshake()
+        connection._task = asyncio.ensure_future(connection._read())
+        return connection
+
+    async def _handshake(self):
+        while True:
+            data = await self._reader.read(READ_CHUNK)
+            if not data:
+                raise ConnectionError("DevTools closed the connection during the handshake")
+            self._ws.receive_data(data)
+            for event in self._ws.events():
+                if isinstance(event, AcceptConnection):
+                    return
+                if isinstance(event, RejectConnection):
+                    raise ConnectionError(f"DevTools refused the connection ({event.status_code})")
+
+    async def _read(self):
+        parts = []
+        try:
+            while True:
+                data = await self._reader.read(READ_CHUNK)
+                self._ws.receive_data(data or None)
+                for event in self._ws.events():
+                    if isinstance(event, TextMessage):
+                        parts.append(event.data)
+                        if event.message_finished:
+                            self._dispatch(json.loads(''.join(parts)))
+                            parts = []
+                    elif isinstance(event, Ping):
+                        self._writer.write(self._ws.send(event.response()))
+                    elif isinstance(event, CloseConnection):
+                        raise ConnectionError("DevTools closed the connection")
+                if not data:
+                    raise ConnectionError("DevTools closed the connection")
+        except Exception as e:
+            self._fail_all(e if isinstance(e, ConnectionError) else ConnectionError(str(e)))
+
+    def _fail_all(self, error):
+        self.closed = True
+        for _, _, future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._waiters.clear()
+
+    def _dispatch(self, message):
+        if 'id' in message:
+            method, _, future = self._pending.pop(message['id'], (None, None, None))
+            if future is None or future.done():
+                return
+            if 'error' in message:
+                future.set_exception(CDPError(f"{method}: {message['error'].get('message')}"))
+            else:
+                future.set_result(message.get('result', {}))
+            return
+
+        method, session = message.get('method'), message.get('sessionId')
+        if method == 'Inspector.targetCrashed':
+            crashed = ConnectionError("the page crashed")
+            for key, (_, pending_session, future) in list(self._pending.items()):
+                if pending_session == session:
+                    self._pending.pop(key)
+                    if not future.done():
+                        future.set_exception(crashed)
+            for waiter in [w for w in self._waiters if w[1] == session]:
+                self._waiters.remove(waiter)
+                if not waiter[2].done():
+                    waiter[2].set_exception(crashed)
+            return
+        for waiter in list(self._waiters):
+            if waiter[0] == method and waiter[1] == session:
+                self._waiters.remove(waiter)
+                if not waiter[2].done():
+                    waiter[2].set_result(message.get('params', {}))
+
+    async def send(self, method, params=None, session=None):
+        """Send a command and return its result"""
+        if self.closed:
+            raise ConnectionError("DevTools connection is closed")
+        message_id = next(self._ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session is not None:
+            message['sessionId'] = session
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = (method, session, future)
+        self._writer.write(self._ws.send(Message(data=json.dumps(message))))
+        await self._writer.drain()
+        return await future
+
+    def expect(self, method, session=None):
+        """Future of the next `method` event of a session; create it before sending the command that causes it"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append([method, session, future])
+        return future
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.closed = True
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+
+
+class Page:
+    """One tab, attached to the browser connection as a flattened session"""
+
+    def __init__(self, connection, target, session):
+        self.connection = connection
+        self.target = target
+        self.session = session
+
+    def send(self, method, params=None):
+        return self.connection.send(method, params, self.session)
+
+    async def prepare(self, block_allow=()):
+        """Same setup as create_driver(): stealth script and network blocking"""
+        await self.send('Page.enable')
+        await self.send('Network.enable')
+        await self.send('Network.setBlockedURLs', {'urls': blocked_patterns(block_allow)})
+        await self.send('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+        await self.send('Emulation.setFocusEmulationEnabled', {'enabled': True})
+
+    async def goto(self, url):
+        loaded = self.connection.expect('Page.loadEventFired', self.session)
+        result = await self.send('Page.navigate', {'url': url})
+        if result.get('errorText'):
+            loaded.cancel()
+            raise NavigationError(f"{url}: {result['errorText']}")
+        await loaded
+
+    async def reload(self):
+        loaded = self.connection.expect('Page.loadEventFired', self.session)
+        await self.send('Page.reload')
+        await loaded
+
+    async def evaluate(self, expression, await_promise=False):
+        result = await self.send('Runtime.evaluate', {
+            'expression': expression, 'returnByValue': True, 'awaitPromise': await_promise,
+        })
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text'))
+        return result['result'].get('value')
+
+    async def call(self, script, *args):
+        """Run a WebDriver-style script (reads `arguments`, may `return`) like execute_script"""
+        return await self.evaluate(f"(function() {{\n{script}\n}}).apply(null, {json.dumps(args)})")
+
+    async def call_async(self, script, *args):
+        """Run a script that reports through its last argument, like execute_async_script"""
+        return await self.evaluate(
+            f"new Promise(done => (function() {{\n{script}\n}}).apply(null, {json.dumps(args)}.concat([done])))",
+            await_promise=True,
+        )
+
+    async def click(self, x, y):
+        for kind in ('mousePressed', 'mouseReleased'):
+            await self.send('Input.dispatchMouseEvent', {'type': kind, 'x': x, 'y': y, 'button': 'left',
+                                                         'clickCount': 1})
+
+    async def content(self):
+        return await self.evaluate('document.documentElement.outerHTML')
+
+    async def close(self):
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': self.target})
+        except (CDPError, ConnectionError):
+            pass
+
+
+class Browser:
+    """Chrome started with --remote-debugging-port, or the one at CHROME_CDP_URL"""
+
+    def __init__(self, connection, process=None, profile=None):
+        self.connection = connection
+        self.process = process
+        self.profile = profile
+
+    @property
+    def closed(self):
+        return self.connection.closed
+
+    @classmethod
+    async def launch(cls):
+        if CDP_URL:
+            return cls(await Connection.open(CDP_URL))
+        print("Starting Chrome for the DevTools engine...")
+        profile = tempfile.mkdtemp(prefix='scraper-chrome-')
+        # chromedriver adds the "--" that chrome_options() leaves off some switches
+        flags = [arg if arg.startswith('-') else f"--{arg}" for arg in chrome_options().arguments]
+        process = await asyncio.create_subprocess_exec(
+            chrome_binary(), *CHROME_FLAGS, *flags, f"--user-data-dir={profile}", 'about:blank',
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            url = await cls._devtools_url(profile, process)
+            return cls(await Connection.open(url), process, profile)
+        except BaseException:
+            process.kill()
+            shutil.rmtree(profile, ignore_errors=True)
+            raise
+
+    @staticmethod
+    async def _devtools_url(profile, process):
+        """Chrome writes its port and browser path to DevToolsActivePort once it listens"""
+        path = os.path.join(profile, 'DevToolsActivePort')
+        deadline = time.monotonic() + STARTUP_SECONDS
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                raise ConnectionError(f"Chrome exited with status {process.returncode}")
+            try:
+                with open(path) as f:
+                    port, browser_path = f.read().split()[:2]
+                return f"ws://127.0.0.1:{port}{browser_path}"
+            except (OSError, ValueError):
+                await asyncio.sleep(0.1)
+        raise DeadlineExceeded(f"Chrome did not start within {STARTUP_SECONDS}s")
+
+    async def new_context(self):
+        """A fresh browser context: no cookies or storage from other brands"""
+        return (await self.connection.send('Target.createBrowserContext', {'disposeOnDetach': True}))['browserContextId']
+
+    async def close_context(self, context):
+        try:
+            await self.connection.send('Target.disposeBrowserContext', {'browserContextId': context})
+        except (CDPError, ConnectionError):
+            pass
+
+    async def new_page(self, context, block_allow=()):
+        target = (await self.connection.send('Target.createTarget', {
+            'url': 'about:blank', 'browserContextId': context,
+        }))['targetId']
+        session = (await self.connection.send('Target.attachToTarget', {
+            'targetId': target, 'flatten': True,
+        }))['sessionId']
+        page = Page(self.connection, target, session)
+        await page.prepare(block_allow)
+        return page
+
+    async def close(self):
+        try:
+            if self.process is not None:
+                await asyncio.wait_for(self.connection.send('Browser.close'), 5)
+        except Exception:
+            pass
+        await self.connection.close()
+        if self.process is not None:
+            try:
+                await asyncio.wait_for(self.process.wait(), 10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+            shutil.rmtree(self.profile, ignore_errors=True)
+
+
+class _Engine:
+    """The background event loop and the browser it drives"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='cdp-engine', daemon=True)
+        self.thread.start()
+        self._browser = None
+        # Created on the loop's thread: before Python 3.10 a Lock binds to the current thread's loop
+        self._launch = None
+
+    async def browser(self):
+        if self._launch is None:
+            self._launch = asyncio.Lock()
+        async with self._launch:
+            if self._browser is None or self._browser.closed:
+                self._browser = await Browser.launch()
+            return self._browser
+
+    def run(self, coroutine, timeout=None, label='DevTools engine'):
+        """Run a coroutine on the engine's loop from any thread and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"{label} exceeded {timeout:.0f}s")
+
+    def shutdown(self):
+        if self._browser is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._browser.close(), self.loop).result(15)
+            except Exception as e:
+                print(f"Error closing Chrome: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """The process-wide engine, started on first use and closed at exit"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _Engine()
+            atexit.register(_engine.shutdown)
+        return _engine
+
+
+@contextmanager
+def _phase(metrics, name):
+    """Time a phase into the brand's metrics; coroutines can't use the thread-local phase()"""
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(name):
+            yield
+
+
+async def within(name, awaitable):
+    """Await one phase of a page, raising DeadlineExceeded like phase_deadline() does for Selenium"""
+    seconds = PHASE_DEADLINES[name] + GRACE
+    try:
+        return await asyncio.wait_for(awaitable, seconds)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{name} phase exceeded {seconds:.0f}s") from None
+
+
+async def scroll_until_stable(page, tile_selector, quiet_period=3.0, step_timeout=1.5,
+                              settle_delay=0.25, max_steps=80, max_seconds=120.0):
+    """scroll_engine.scroll_until_stable() for a CDP page; the settle waits run in the page, not the loop"""
+    progress = ScrollProgress(quiet_period, max_steps, max_seconds)
+    while progress.running():
+        progress.record(await page.call_async(
+            SCROLL_STEP_SCRIPT, tile_selector, int(step_timeout * 1000), int(settle_delay * 1000)
+        ))
+    return progress.finish()
+
+
+async def scrape(page, config, url, first_page=True, metrics=None):
+    """Load one collection page in a tab and return the rendered HTML, like scrape_engine.scrape()"""
+    print(f"Opening URL: {url}")
+    with _phase(metrics, 'load'):
+        await within('load', page.goto(url))
+        print("Waiting for page to load...")
+        await asyncio.sleep(config.load_wait if first_page else config.next_load_wait)
+
+    with _phase(metrics, 'popups'):
+        print("Attempting to close modals and popups...")
+        primary, fallback = selector_order(config.brand, config.popup_selectors)
+        try:
+            matched = await within('popups', page.call(DISMISS_SCRIPT, primary, fallback)) or []
+            report_matches(config.brand, matched)
+        except CDPError as e:
+            print(f"Failed to close modals: {e}")
+            matched = []
+        # The fallbacks are for the first load only, as in scrape_engine.scrape()
+        if first_page:
+            if matched and config.popup_fallback == 'refresh':
+                print("Refreshing page to ensure clean state...")
+                await within('popups', page.reload())
+                await asyncio.sleep(2)
+                await page.evaluate("document.documentElement.style.overflow = 'auto';")
+            elif not matched and config.popup_fallback == 'click_outside':
+                try:
+                    await page.click(10, 10)
+                except CDPError as e:
+                    print(f"Failed to click outside the modal: {e}")
+
+    if config.page_state:
+        with _phase(metrics, 'page_state'):
+            html = await within('page_state', page.content())
+            if extract_products(html, config.brand, config.site_url):
+                print("Found product list in embedded page state, skipping scrolling")
+                return html
+
+    print("Scrolling to load all products...")
+    with _phase(metrics, 'scroll'):
+        await within('scroll', scroll_until_stable(page, config.tile_selector,
+                                                   max_seconds=PHASE_DEADLINES['scroll']))
+    return await page.content()
+
+
+def archive_and_parse(config, checkpoint, url, html, seen, metrics):
+    """Compress a page into the checkpoint and parse its new rows; runs in a worker thread, off the loop"""
+    # Synchronous, so it records into the brand's metrics through the thread-local
+    with attached(metrics):
+        with phase('archive'):
+            checkpoint.add_page(url, html)
+        print("Extracting product data...")
+        with phase('parse'):
+            return scrape_engine.new_rows(scrape_engine.parse_page(config, html), seen)
+
+
+async def load_collection(browser, context, config, collection, checkpoint, products=(), start=1, metrics=None):
+    """Load a collection's pages from page `start` in a tab of its own; returns its rows.
+
+    `products` are the rows of the pages before `start` (from a checkpoint).
+    A page that adds no new products ends the collection, as in scrape_engine.run().
+    """
+    collection_config = config.for_collection(collection)
+    products = list(products)
+    seen = {product_key(row.url) for row in products}
+    page = await browser.new_page(context, config.block_allow)
+    try:
+        if start == 1:
+            checkpoint.start()
+        for number, url in enumerate(scrape_engine.page_urls(config, collection), 1):
+            if number < start:
+                continue
+            html = await scrape(page, config, url, number == start, metrics)
+            fresh = await asyncio.get_running_loop().run_in_executor(
+                None, archive_and_parse, collection_config, checkpoint, url, html, seen, metrics
+            )
+            if not fresh and number > 1:
+                print(f"Page {number} of {collection.name} has no new products, stopping")
+                break
+            products.extend(fresh)
+        checkpoint.captured()
+    finally:
+        await page.close()
+    return products
+
+
+async def load_brand(config, loads, metrics=None):
+    """Load collections side by side in one browser context; returns name -> rows or the exception raised"""
+    browser = await engine().browser()
+    context = await browser.new_context()
+    try:
+        outcomes = await asyncio.gather(*(
+            load_collection(browser, context, config, collection, checkpoint, products, start, metrics)
+            for collection, checkpoint, products, start in loads.values()
+        ), return_exceptions=True)
+    finally:
+        await browser.close_context(context)
+    return dict(zip(loads, outcomes))
+
+
+def run(config, sink=None, names=None, resume=False, timeout=None):
+    """Scrape the brand's collections concurrently in the shared Chrome and upload the results.
+
+    Same contract as scrape_engine.run(): returns the rows of each
+    collection, or raises ScrapeFailed for the collections that failed
+    after uploading the rest. `timeout` bounds the whole brand.
+    """
+    results, collected, failures, loads = {}, {}, {}, {}
+    for collection in config.select(names):
+        checkpoint = Checkpoint(collection.name)
+        if scrape_engine.resumed(checkpoint, resume):
+            results[collection.name] = checkpoint.rows()
+            continue
+        try:
+            if resume and checkpoint.reached(EXTRACTED):
+                print(f"{collection.name}: resuming from the extracted rows")
+                collected[collection.name] = checkpoint.rows()
+                continue
+            products, start = [], 1
+            if resume and checkpoint.reached(CAPTURED):
+                print(f"{collection.name}: resuming from {checkpoint.page_count} captured pages")
+                products = scrape_engine.extract(config.for_collection(collection), checkpoint, checkpoint.pages())
+                if checkpoint.complete:
+                    collected[collection.name] = products
+                    continue
+                start = checkpoint.page_count + 1
+            loads[collection.name] = (collection, checkpoint, products, start)
+        except Exception as e:
+            print(f"Error scraping {collection.name}: {e}")
+            failures[collection.name] = e
+
+    if loads:
+        outcomes = engine().run(load_brand(config, loads, current()), timeout, config.name)
+        for name, outcome in outcomes.items():
+            if isinstance(outcome, BaseException):
+                print(f"Error scraping {name}: {outcome}")
+                failures[name] = outcome
+            else:
+                collected[name] = outcome
+                if outcome:
+                    loads[name][1].extracted(outcome)
+    return scrape_engine.finish_run(config, collected, results, failures, sink)
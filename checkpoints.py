@@ -0,0 +1,127 @@
+"""Per-collection checkpoints so a retried run resumes where the last one stopped.
+
+Each collection's day moves through four stages, recorded in
+<state dir>/checkpoints/<date>/<worksheet>.json:
+
+    captured    pages loaded so far (kept in the snapshot archive, or next to
+                the checkpoint when SCRAPER_ARCHIVE=0); "complete" once no
+                more pages follow
+    extracted   rows parsed from the pages
+    stored      rows written to the local history and queued for Sheets
+    uploaded    rows sent to Google Sheets
+
+With resume on (run_all_scrapers.py --retry-failed or --resume), a
+collection past "stored" is skipped, one at "extracted" is only uploaded and
+one at "captured" is parsed again from the saved pages, loading only the
+pages after them if the collection was not complete.
+Rows that are stored but not yet uploaded wait in the Sheets outbox
+(sheets_outbox.py), so a retry never has to scrape them again.
+"""
+import datetime
+import glob
+import os
+import shutil
+
+import zstandard
+
+from local_state import STATE_DIR, load_json, save_json, state_path
+from row_schema import Row, run_date
+from snapshot_archive import archive_snapshot, load_snapshot, snapshots
+
+CAPTURED, EXTRACTED, STORED, UPLOADED = 'captured', 'extracted', 'stored', 'uploaded'
+STAGES = [None, CAPTURED, EXTRACTED, STORED, UPLOADED]
+
+CHECKPOINT_DIR = os.path.join(STATE_DIR, 'checkpoints')
+# Checkpoints older than this are removed
+KEEP_DAYS = 7
+
+
+class Checkpoint:
+    """The stages one collection has completed today"""
+
+    def __init__(self, worksheet, date=None):
+        self.worksheet = worksheet
+        self.date = date or run_date()
+        self.path = state_path('checkpoints', self.date, f"{worksheet}.json")
+        data = load_json(self.path, {})
+        self.stage = data.get('stage')
+        # False while more pages of the collection may follow
+        self.complete = data.get('complete', False)
+        self._pages = data.get('pages', [])
+        self._rows = data.get('rows', [])
+
+    def reached(self, stage):
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def _save(self, stage):
+        self.stage = stage
+        save_json(self.path, {'stage': stage, 'complete': self.complete, 'pages': self._pages, 'rows': self._rows})
+
+    def start(self):
+        """Forget an earlier attempt's stages before loading the pages again"""
+        self._pages, self._rows, self.complete = [], [], False
+        self._save(None)
+
+    def add_page(self, url, html):
+        """Keep a loaded page so the collection can be parsed again without a browser.
+
+        The collection counts as captured from its first page on; resuming
+        a collection that is not complete loads the pages after the saved ones.
+        """
+        sha = archive_snapshot(self.worksheet, url, html, self.date)
+        if sha is not None:
+            self._pages.append({'url': url, 'sha': sha})
+        else:
+            path = state_path('checkpoints', self.date, f"{self.worksheet}-{len(self._pages) + 1}.html.zst")
+            with open(path, 'wb') as f:
+                f.write(zstandard.ZstdCompressor().compress(html.encode('utf-8')))
+            self._pages.append({'url': url, 'file': path})
+        self._save(CAPTURED)
+
+    def captured(self):
+        """No more pages follow the saved ones"""
+        self.complete = True
+        self._save(self.stage)
+
+    def pages(self):
+        """(url, html) of every saved page, in load order"""
+        archived = {e['sha']: e for e in snapshots(self.worksheet)}
+        for page in self._pages:
+            if 'sha' in page:
+                yield page['url'], load_snapshot(archived[page['sha']])
+            else:
+                with open(page['file'], 'rb') as f:
+                    yield page['url'], zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+    def extracted(self, rows):
+        self._rows = [list(row) for row in rows]
+        self._save(EXTRACTED)
+
+    def rows(self):
+        return [Row(*row) for row in self._rows]
+
+    def stored(self):
+        self._save(STORED)
+
+    def uploaded(self):
+        self._save(UPLOADED)
+
+
+def mark_uploaded(date=None):
+    """Move every collection stored today to "uploaded" once Sheets has the rows"""
+    for path in glob.glob(os.path.join(CHECKPOINT_DIR, date or run_date(), '*.json')):
+        checkpoint = Checkpoint(os.path.basename(path)[:-len('.json')], date)
+        if checkpoint.stage == STORED:
+            checkpoint.uploaded()
+
+
+def prune(keep_days=KEEP_DAYS):
+    """Remove checkpoints older than keep_days"""
+    cutoff = (datetime.date.today() - datetime.timedelta(days=keep_days)).isoformat()
+    for directory in glob.glob(os.path.join(CHECKPOINT_DIR, '*')):
+        if os.path.basename(directory) < cutoff:
+            shutil.rmtree(directory, ignore_errors=True)
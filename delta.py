@@ -0,0 +1,126 @@
+"""Incremental delta mode: only new, removed and re-priced products reach Sheets.
+
+A persistent index per worksheet under <state dir>/delta/ remembers the last
+seen state of every product, keyed by its normalized URL, along with a
+presence bitmap (bit n set = seen n days after the index was started).
+"""
+import datetime
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit
+
+from local_state import load_json, save_json, state_path
+
+# "full" appends the whole snapshot as before, "delta" sends only changes to Sheets.
+# Delta needs the index from earlier runs, so only use it where the state directory persists.
+SHEETS_MODE = os.environ.get('SCRAPER_SHEETS_MODE', 'full')
+
+ADDED = 'added'
+REMOVED = 'removed'
+PRICE_CHANGED = 'price changed'
+
+
+def product_key(url):
+    """Canonical product identity: lower-case host and path without query, fragment or collection prefix"""
+    parts = urlsplit(str(url).strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/').lower()
+    # Shopify serves /collections/<handle>/products/<product> and /products/<product>
+    if '/products/' in path:
+        path = path[path.index('/products/'):]
+    query = parts.query if path.endswith('/product.do') else ''
+    return urlunsplit(('https', host, path, query, ''))
+
+
+def _day(value):
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+class DeltaIndex:
+    """Last seen state of every product for one worksheet"""
+
+    def __init__(self, worksheet):
+        self.path = state_path('delta', f"{worksheet}.json")
+        data = load_json(self.path, {})
+        self.epoch = data.get('epoch')
+        self.last_run = data.get('last_run')
+        self.products = data.get('products', {})
+
+    def save(self):
+        save_json(self.path, {'epoch': self.epoch, 'last_run': self.last_run, 'products': self.products})
+
+    def presence_days(self, key):
+        """Dates on which a product was seen, decoded from its bitmap"""
+        bits = int(self.products[key]['presence'], 16)
+        start = _day(self.epoch)
+        return [start + datetime.timedelta(days=n) for n in range(bits.bit_length()) if bits >> n & 1]
+
+    def apply(self, rows):
+        """Update the index with today's snapshot and return (change, row, previous price) tuples"""
+        if not rows:
+            return []
+        today = _day(rows[0][1])
+        if self.epoch is None:
+            self.epoch = today.isoformat()
+        bit = 1 << (today - _day(self.epoch)).days
+
+        changes = []
+        seen = set()
+        for row in rows:
+            key = product_key(row[5])
+            seen.add(key)
+            entry = self.products.get(key)
+            # New, or back after missing the previous run
+            if entry is None or (entry['last_seen'] != self.last_run and entry['last_seen'] != today.isoformat()):
+                changes.append((ADDED, row, ''))
+                entry = self.products[key] = {'first_seen': today.isoformat(), 'presence': '0'}
+            elif entry['price'] != row[4]:
+                changes.append((PRICE_CHANGED, row, entry['price']))
+            entry.update({
+                'last_seen': today.isoformat(),
+                'name': row[3],
+                'price': row[4],
+                'url': row[5],
+                'image_url': row[6],
+                'brand': row[2],
+                'presence': format(int(entry['presence'], 16) | bit, 'x'),
+            })
+
+        # Anything present on the previous run but missing today has been removed
+        if self.last_run and self.last_run != today.isoformat():
+            for key, entry in self.products.items():
+                if key not in seen and entry['last_seen'] == self.last_run:
+                    row = [0, today.isoformat(), entry['brand'], entry['name'], entry['price'], entry['url'], entry['image_url']]
+                    changes.append((REMOVED, row, entry['price']))
+
+        self.last_run = today.isoformat()
+        return changes
+
+
+class DeltaSink:
+    """Forwards only additions, removals and price changes to the wrapped sink.
+
+    Change rows go to a "<worksheet>_changes" worksheet with two extra
+    columns: the kind of change and the previous price.
+    """
+
+    def __init__(self, downstream):
+        self.downstream = downstream
+        self._lock = threading.Lock()
+
+    def add(self, sheet_name, rows):
+        with self._lock:
+            index = DeltaIndex(sheet_name)
+            changes = index.apply(rows)
+            index.save()
+
+        counts = {kind: sum(1 for change in changes if change[0] == kind) for kind in (ADDED, REMOVED, PRICE_CHANGED)}
+        print(f"{sheet_name}: {counts[ADDED]} added, {counts[REMOVED]} removed, {counts[PRICE_CHANGED]} price changes")
+        if changes:
+            delta_rows = [list(row[:7]) + [kind, previous] for kind, row, previous in changes]
+            self.downstream.add(f"{sheet_name}_changes", delta_rows)
+
+    def flush(self):
+        return self.downstream.flush()
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from network_profile import apply_blocking
+from run_metrics import phase
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+
+# Hide navigator.webdriver on every page the driver opens
+STEALTH_SCRIPT = """
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined
+});
+"""
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def chrome_options():
+    """Build the headless Chrome options shared by every scraper"""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920x1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--lang=en")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    # Network events feed the bytes downloaded / requests blocked report
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def driver_path():
+    """Resolve the chromedriver binary once per process"""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+        return _driver_path
+
+
+def create_driver(block_allow=()):
+    """Start a configured headless Chrome driver with the network blocking profile"""
+    print("Setting up Chrome driver...")
+    with phase('driver'):
+        driver = webdriver.Chrome(service=Service(driver_path()), options=chrome_options())
+
+        # Execute CDP commands to prevent detection
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_SCRIPT})
+        # Skip images, media, fonts and tracker scripts the scrapers never read
+        apply_blocking(driver, block_allow)
+    return driver
+
+
+def reset_driver(driver):
+    """Clear cookies and storage so the next brand starts from a clean session"""
+    # Close any extra tabs a site may have opened
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    origin = driver.execute_script("return window.location.origin")
+    if origin and origin.startswith("http"):
+        driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.get("about:blank")
+
+
+class DriverPool:
+    """Hands out long-lived Chrome drivers to brands in turn.
+
+    Drivers are started lazily, reset between leases and replaced if a
+    lease leaves one unusable. Setup and lease durations are recorded so
+    they can be printed with report().
+    """
+
+    def __init__(self, size=1):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.setup_times = []
+        self.lease_times = []
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if not can_create:
+            return self._idle.get()
+
+        start = time.perf_counter()
+        try:
+            driver = create_driver()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        self.setup_times.append(time.perf_counter() - start)
+        return driver
+
+    def _release(self, driver):
+        try:
+            with phase('reset'):
+                reset_driver(driver)
+        except Exception as e:
+            # Includes drivers quit by a deadline watchdog, whose calls fail below Selenium
+            print(f"Discarding broken driver: {e}")
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def lease(self, name, block_allow=()):
+        """Borrow a driver for one brand and give it back afterwards"""
+        driver = self._acquire()
+        # Drivers are shared, so each lease sets the brand's own allow-list
+        apply_blocking(driver, block_allow)
+        start = time.perf_counter()
+        try:
+            yield driver
+        finally:
+            self.lease_times.append((name, time.perf_counter() - start))
+            self._release(driver)
+
+    def close(self):
+        """Quit every idle driver"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+
+    def report(self):
+        """Print how long driver setup and each lease took"""
+        print(f"\n{'='*80}")
+        print("Driver pool timings")
+        print(f"{'='*80}")
+        for i, seconds in enumerate(self.setup_times, 1):
+            print(f"Driver {i} setup: {seconds:.1f}s")
+        for name, seconds in self.lease_times:
+            print(f"{name}: {seconds:.1f}s")
+        total = sum(self.setup_times) + sum(seconds for _, seconds in self.lease_times)
+        print(f"Total: {total:.1f}s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,175 @@
+"""Local Parquet history of every scrape, partitioned by brand and date.
+
+Layout: <state dir>/history/brand=<brand>/date=<YYYY-MM-DD>/<worksheet>.parquet
+(brand names are URI-encoded in the path).
+
+Re-running a collection on the same day replaces that day's file, so the
+store always holds one snapshot per collection per day.
+
+Usage:
+    python history_store.py export --brand lululemon --since 2026-01-01 out.csv
+"""
+import argparse
+import datetime
+import os
+import re
+import threading
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from delta import SHEETS_MODE, DeltaSink
+from local_state import STATE_DIR
+from sheets_outbox import OutboxSink
+
+HISTORY_DIR = os.path.join(STATE_DIR, 'history')
+
+# Set SCRAPER_SHEETS_MIRROR=0 to keep data only in the local store
+SHEETS_MIRROR = os.environ.get('SCRAPER_SHEETS_MIRROR', '1') != '0'
+
+SCHEMA = pa.schema([
+    ('index', pa.int32()),
+    ('date', pa.date32()),
+    ('brand', pa.string()),
+    ('worksheet', pa.string()),
+    ('product_name', pa.string()),
+    ('price', pa.string()),
+    ('url', pa.string()),
+    ('image_url', pa.string()),
+])
+
+PARTITION_SCHEMA = pa.schema([('brand', pa.string()), ('date', pa.date32())])
+
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')
+
+
+def _as_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+class HistoryStore:
+    """Reads and writes the partitioned history files"""
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+
+    def write(self, worksheet, rows):
+        """Store Index/Date/Brand/Product Name/Price/URL/Image URL rows for one worksheet"""
+        if not rows:
+            return None
+        columns = list(zip(*rows))
+        brand = columns[2][0]
+        date = _as_date(columns[1][0])
+
+        # Brand and date live in the partition path, the rest in the file
+        table = pa.table({
+            'index': pa.array(columns[0], pa.int32()),
+            'worksheet': pa.array([worksheet] * len(rows), pa.string()),
+            'product_name': pa.array(columns[3], pa.string()),
+            'price': pa.array(columns[4], pa.string()),
+            'url': pa.array(columns[5], pa.string()),
+            'image_url': pa.array(columns[6], pa.string()),
+        })
+        directory = os.path.join(self.root, f"brand={quote(brand, safe='')}", f"date={date.isoformat()}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_slug(worksheet)}.parquet")
+        tmp = f"{path}.tmp"
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, path)
+        return path
+
+    def read(self, brand=None, since=None, until=None, worksheet=None, columns=None):
+        """Load history as a pyarrow Table, pruning partitions by brand and date"""
+        # pyarrow.dataset imports pandas, so it is only loaded when history is read
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(self.root):
+            return SCHEMA.empty_table()
+        dataset = ds.dataset(self.root, format='parquet', partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+                             schema=SCHEMA, exclude_invalid_files=True)
+        condition = None
+        filters = []
+        if brand is not None:
+            filters.append(ds.field('brand') == brand)
+        if since is not None:
+            filters.append(ds.field('date') >= _as_date(since))
+        if until is not None:
+            filters.append(ds.field('date') <= _as_date(until))
+        if worksheet is not None:
+            filters.append(ds.field('worksheet') == worksheet)
+        for f in filters:
+            condition = f if condition is None else condition & f
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def read_frame(self, **filters):
+        """Same as read() as a pandas DataFrame; pandas is only imported here"""
+        return self.read(**filters).to_pandas()
+
+
+class HistorySink:
+    """Writes rows to the local history first and mirrors them to Google Sheets.
+
+    Has the same add()/flush() interface as SheetsSink. If the Sheets
+    mirror fails the rows are already safe on disk.
+    """
+
+    def __init__(self, store=None, mirror=None):
+        self.store = store or HistoryStore()
+        self.mirror = mirror
+        self._lock = threading.Lock()
+
+    def add(self, sheet_name, rows):
+        with self._lock:
+            path = self.store.write(sheet_name, rows)
+        if path:
+            print(f"Saved {len(rows)} rows to {path}")
+        if self.mirror is not None:
+            self.mirror.add(sheet_name, rows)
+
+    def flush(self):
+        if self.mirror is None:
+            return 0
+        return self.mirror.flush()
+
+
+def default_sink(full_snapshot=None):
+    """Local history store, mirrored to Google Sheets unless SCRAPER_SHEETS_MIRROR=0.
+
+    The mirror receives every row unless `full_snapshot` is false (or
+    SCRAPER_SHEETS_MODE=delta), in which case it receives only changes.
+    """
+    if not SHEETS_MIRROR:
+        return HistorySink()
+    if full_snapshot is None:
+        full_snapshot = SHEETS_MODE == 'full'
+    mirror = OutboxSink()
+    return HistorySink(mirror=mirror if full_snapshot else DeltaSink(mirror))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help='write history rows to CSV or Parquet')
+    export.add_argument('out', help='output path ending in .csv or .parquet')
+    export.add_argument('--brand')
+    export.add_argument('--worksheet')
+    export.add_argument('--since')
+    export.add_argument('--until')
+    args = parser.parse_args()
+
+    table = HistoryStore().read(brand=args.brand, since=args.since, until=args.until, worksheet=args.worksheet)
+    if args.out.endswith('.parquet'):
+        pq.write_table(table, args.out)
+    else:
+        pacsv.write_csv(table, args.out)
+    print(f"Exported {table.num_rows} rows to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+# Set SCRAPER_HTML_PARSER to force one backend for every brand
+PARSER_OVERRIDE = os.environ.get('SCRAPER_HTML_PARSER')
+
+SIMPLE_SELECTOR_RE = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)+)$')
+
+
+def resolve_backend(backend='lxml'):
+    """Pick the BeautifulSoup tree builder, falling back to the stdlib parser"""
+    backend = PARSER_OVERRIDE or backend
+    if backend == 'lxml' and not HAVE_LXML:
+        return 'html.parser'
+    return backend
+
+
+def tile_strainer(selector):
+    """Turn a "tag.class.class" tile selector into a SoupStrainer.
+
+    Only the matching elements and their descendants are built, so the
+    page chrome around the product grid is never turned into Tag objects.
+    Returns None for selectors that cannot be expressed this way.
+    """
+    match = SIMPLE_SELECTOR_RE.match(selector.strip())
+    if not match:
+        return None
+    name, classes = match.group(1), match.group(2)[1:].split('.')
+    required = set(classes)
+
+    # Called with the raw attribute string, which may hold other classes too
+    def has_all_classes(value):
+        return bool(value) and required <= set(value.split())
+
+    return SoupStrainer(name, class_=has_all_classes)
+
+
+def make_soup(html, backend='lxml', scope=None):
+    """Parse HTML with the chosen backend, optionally only the `scope` tile elements"""
+    strainer = tile_strainer(scope) if scope else None
+    return BeautifulSoup(html, resolve_backend(backend), parse_only=strainer)
@@ -0,0 +1,189 @@
+"""Local copies of product images, stored by content hash.
+
+The Image URL column points at live CDN URLs that disappear when products
+rotate, and each brand picks a different size. This stage rewrites every
+image URL to one thumbnail width (SCRAPER_IMAGE_WIDTH) where the CDN
+supports it, downloads the images on a bounded thread pool and stores them
+under their SHA-256:
+
+    <state dir>/images/objects/<sha[:2]>/<sha>.<ext>   image files
+    <state dir>/images/urls/<key[:2]>/<key>.json      URL -> sha, ETag, Last-Modified
+
+An image seen within SCRAPER_IMAGE_REVALIDATE_HOURS is not requested at
+all. After that it is revalidated with If-None-Match / If-Modified-Since,
+so an unchanged image costs a 304 and no body.
+
+Usage:
+    python run_all_scrapers.py --images
+    python image_store.py lookup <image url>
+"""
+import argparse
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from local_state import load_json, save_json, state_path
+from run_metrics import count, phase
+from shopify_fetcher import http_session
+
+IMAGE_WIDTH = int(os.environ.get('SCRAPER_IMAGE_WIDTH', 400))
+IMAGE_WORKERS = int(os.environ.get('SCRAPER_IMAGE_WORKERS', 8))
+REVALIDATE_HOURS = float(os.environ.get('SCRAPER_IMAGE_REVALIDATE_HOURS', 168))
+
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'image/avif': 'avif', 'image/gif': 'gif'}
+
+# Shopify's legacy size suffix: shirt_1200x.jpg, shirt_800x1000_crop_center.jpg
+SHOPIFY_SUFFIX_RE = re.compile(r'_(\d+x\d*|\d*x\d+)(_crop_[a-z]+)?(@\dx)?(?=\.[a-z]+$)', re.I)
+
+FRESH, REVALIDATED, DOWNLOADED, FAILED = 'fresh', 'revalidated', 'downloaded', 'failed'
+
+
+def _with_query(parts, drop, add):
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in drop]
+    return urlunsplit(parts._replace(query=urlencode(query + list(add.items()))))
+
+
+def thumbnail_url(url, width=IMAGE_WIDTH):
+    """The same image at the standard thumbnail width, where the CDN can resize it"""
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    if host.endswith('cdn.shopify.com') or '/cdn/shop/' in parts.path:
+        path = SHOPIFY_SUFFIX_RE.sub('', parts.path)
+        return _with_query(parts._replace(path=path), ('width', 'height', 'crop'), {'width': str(width)})
+    if host.startswith('images.lululemon.com'):
+        # Scene7: wid/hei pick the rendition, size= would override them
+        return _with_query(parts, ('wid', 'hei', 'size', 'fit'), {'wid': str(width)})
+    # Other CDNs (Athleta's /webcontent/) serve one size
+    return url
+
+
+class ImageStore:
+    """Content-addressed image files plus the validators of every URL"""
+
+    def __init__(self, revalidate_hours=REVALIDATE_HOURS, session=None):
+        self.revalidate = revalidate_hours * 3600
+        self.session = session or http_session()
+
+    def _url_path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return state_path('images', 'urls', key[:2], f"{key}.json")
+
+    def object_path(self, sha, ext):
+        return state_path('images', 'objects', sha[:2], f"{sha}.{ext}")
+
+    def lookup(self, url):
+        """Stored entry of a (thumbnail) URL, or None"""
+        return load_json(self._url_path(url), None)
+
+    def fetch(self, url):
+        """Make sure the image at `url` is stored; returns (status, entry, bytes transferred)"""
+        entry = self.lookup(url)
+        if entry and not os.path.exists(self.object_path(entry['sha'], entry['ext'])):
+            entry = None
+        if entry and time.time() - entry['checked'] < self.revalidate:
+            return FRESH, entry, 0
+
+        headers = {'Accept': 'image/avif,image/webp,image/*'}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = self.session.get(url, headers=headers, timeout=20)
+            if response.status_code == 304 and entry:
+                entry['checked'] = time.time()
+                save_json(self._url_path(url), entry)
+                return REVALIDATED, entry, 0
+            response.raise_for_status()
+        except (requests.RequestException, OSError) as e:
+            print(f"Could not download image {url}: {e}")
+            return FAILED, entry, 0
+
+        body = response.content
+        sha = hashlib.sha256(body).hexdigest()
+        ext = EXTENSIONS.get(response.headers.get('Content-Type', '').split(';')[0].strip(), 'img')
+        path = self.object_path(sha, ext)
+        entry = {
+            'url': url,
+            'sha': sha,
+            'ext': ext,
+            'bytes': len(body),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'checked': time.time(),
+        }
+        # Unique per writer: two threads or workers may store the same picture at once
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # The same picture under another URL is stored once
+            if not os.path.exists(path):
+                with open(tmp, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            save_json(self._url_path(url), entry)
+        except OSError as e:
+            print(f"Could not store image {url}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return FAILED, self.lookup(url), len(body)
+        return DOWNLOADED, entry, len(body)
+
+
+def store_images(rows, store=None):
+    """Store the thumbnail of every row's image; returns the counts by status and bytes transferred"""
+    store = store or ImageStore()
+    urls = []
+    for row in rows:
+        if str(row.image_url).startswith('http'):
+            url = thumbnail_url(row.image_url)
+            if url not in urls:
+                urls.append(url)
+
+    report = {FRESH: 0, REVALIDATED: 0, DOWNLOADED: 0, FAILED: 0, 'bytes': 0}
+    if urls:
+        with ThreadPoolExecutor(max_workers=min(IMAGE_WORKERS, len(urls))) as executor:
+            for status, _, transferred in executor.map(store.fetch, urls):
+                report[status] += 1
+                report['bytes'] += transferred
+    return report
+
+
+def store_collection_images(config, collections):
+    """Store the images of every collection's rows (collection name -> rows) and print the report"""
+    store = ImageStore()
+    with phase('images'):
+        report = store_images([row for rows in collections.values() for row in rows], store)
+    total = sum(report[s] for s in (FRESH, REVALIDATED, DOWNLOADED, FAILED))
+    hits = report[FRESH] + report[REVALIDATED]
+    for name in (FRESH, REVALIDATED, DOWNLOADED, FAILED):
+        count(f"images_{name}", report[name])
+    count('image_bytes', report['bytes'])
+    if total:
+        print(f"{config.name}: {total} images, {hits / total:.0%} cache hits ({report[FRESH]} fresh, "
+              f"{report[REVALIDATED]} not modified), {report[DOWNLOADED]} downloaded "
+              f"({report['bytes'] / 1e6:.1f} MB), {report[FAILED]} failed")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    find = sub.add_parser('lookup', help='show the stored file of an image URL')
+    find.add_argument('url')
+    args = parser.parse_args()
+
+    url = thumbnail_url(args.url)
+    entry = ImageStore().lookup(url)
+    if entry is None:
+        raise SystemExit(f"{url} has not been stored")
+    print(f"{url}\n  {ImageStore().object_path(entry['sha'], entry['ext'])}  {entry['bytes'] / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
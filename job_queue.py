@@ -0,0 +1,355 @@
+"""SQLite job queue so collections can be scraped by several worker processes.
+
+One job per collection. Workers claim a job with a lease (SCRAPER_JOB_LEASE
+seconds) and renew it with a heartbeat while they scrape; a job whose worker
+stopped heartbeating is claimed again by another worker once the lease runs
+out. Failed jobs are retried with backoff up to SCRAPER_JOB_ATTEMPTS times when
+the error is transient; workers make one attempt per job and leave retries to
+the queue. A job's rows are held back until the job is marked done, so a
+worker that lost its lease never stores or uploads them. Collections on the
+same domain are started at least SCRAPER_DOMAIN_INTERVAL seconds apart across
+all workers.
+
+The queue lives in <state dir>/jobs.sqlite (or SCRAPER_QUEUE). Workers on
+several machines can share it on a volume that supports SQLite file locks.
+
+Usage:
+    python job_queue.py enqueue [brand or collection ...]
+    python job_queue.py work --exit-when-empty       (start as many as you like)
+    python job_queue.py status
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from brands import BRANDS
+from checkpoints import STORED, Checkpoint
+from driver_pool import DriverPool
+from history_store import default_sink
+from local_state import state_path
+from orchestrator import domain_of
+from run_all_scrapers import SCRAPERS, run_scraper, select_collections
+from run_metrics import new_run_id
+from supervision import TRANSIENT, ScrapeFailed, backoff, classify
+
+QUEUE_PATH = os.environ.get('SCRAPER_QUEUE') or state_path('jobs.sqlite')
+LEASE_SECONDS = float(os.environ.get('SCRAPER_JOB_LEASE', 120))
+JOB_ATTEMPTS = int(os.environ.get('SCRAPER_JOB_ATTEMPTS', 3))
+DOMAIN_INTERVAL = float(os.environ.get('SCRAPER_DOMAIN_INTERVAL', 30))
+# How long an idle worker waits before looking for a job again
+POLL_SECONDS = 5.0
+
+QUEUED, LEASED, DONE, FAILED = 'queued', 'leased', 'done', 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (run_id, collection)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before);
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    last_start REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    run_id: str
+    brand: str
+    collection: str
+    attempts: int
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job after this worker's lease ran out"""
+
+
+class JobQueue:
+    """Jobs stored in SQLite; every method is one transaction, safe across processes"""
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=LEASE_SECONDS, domain_interval=DOMAIN_INTERVAL):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.domain_interval = domain_interval
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        # A new connection per transaction keeps the queue usable from heartbeat threads
+        db = self._connect()
+        try:
+            # The default rollback journal, unlike WAL, also works on shared volumes
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+        finally:
+            db.close()
+
+    def enqueue(self, run_id, jobs, max_attempts=JOB_ATTEMPTS):
+        """Add (brand, collection, url) jobs for a run; jobs already queued for it are left alone"""
+        now = time.time()
+        with self._transaction() as db:
+            for brand, collection, url in jobs:
+                db.execute(
+                    'INSERT OR IGNORE INTO jobs (run_id, brand, collection, domain, status, max_attempts, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, brand, collection, domain_of(url), QUEUED, max_attempts, now))
+
+    def claim(self, worker):
+        """Lease the next job that is due and whose domain is free, or return None.
+
+        Jobs whose lease ran out count as queued again, unless that was their
+        last attempt.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            expired = db.execute('SELECT id, attempts, max_attempts FROM jobs WHERE status = ? AND lease_expires < ?',
+                                 (LEASED, now)).fetchall()
+            for job in expired:
+                status = FAILED if job['attempts'] >= job['max_attempts'] else QUEUED
+                db.execute('UPDATE jobs SET status = ?, worker = NULL, error = ?, updated = ? WHERE id = ?',
+                           (status, 'lease expired', now, job['id']))
+            row = db.execute(
+                'SELECT jobs.* FROM jobs LEFT JOIN domains USING (domain) '
+                'WHERE status = ? AND not_before <= ? AND (last_start IS NULL OR last_start <= ?) '
+                'ORDER BY not_before, id LIMIT 1',
+                (QUEUED, now, now - self.domain_interval)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_expires = ?, '
+                       'updated = ? WHERE id = ?', (LEASED, worker, now + self.lease_seconds, now, row['id']))
+            db.execute('INSERT OR REPLACE INTO domains (domain, last_start) VALUES (?, ?)', (row['domain'], now))
+        return Job(row['id'], row['run_id'], row['brand'], row['collection'], row['attempts'] + 1)
+
+    def heartbeat(self, job, worker):
+        """Extend the lease; raises LeaseLost if the job is no longer this worker's"""
+        now = time.time()
+        with self._transaction() as db:
+            updated = db.execute('UPDATE jobs SET lease_expires = ?, updated = ? '
+                                 'WHERE id = ? AND worker = ? AND status = ?',
+                                 (now + self.lease_seconds, now, job.id, worker, LEASED)).rowcount
+        if not updated:
+            raise LeaseLost(f"job {job.id} ({job.collection}) is no longer leased by {worker}")
+
+    def complete(self, job, worker, result=None):
+        """Mark the job done; returns False if the worker no longer holds its lease"""
+        with self._transaction() as db:
+            updated = db.execute('UPDATE jobs SET status = ?, lease_expires = NULL, error = NULL, result = ?, '
+                                 'updated = ? WHERE id = ? AND worker = ? AND status = ?',
+                                 (DONE, json.dumps(result), time.time(), job.id, worker, LEASED)).rowcount
+        return bool(updated)
+
+    def fail(self, job, worker, error):
+        """Queue the job again after a backoff if the error is transient and attempts are left"""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute('SELECT attempts, max_attempts FROM jobs WHERE id = ?', (job.id,)).fetchone()
+            retry = classify(error) == TRANSIENT and row['attempts'] < row['max_attempts']
+            db.execute('UPDATE jobs SET status = ?, lease_expires = NULL, not_before = ?, error = ?, updated = ? '
+                       'WHERE id = ? AND worker = ?',
+                       (QUEUED if retry else FAILED, now + backoff(row['attempts']) if retry else 0,
+                        str(error), now, job.id, worker))
+        return retry
+
+    def pending(self, run_id=None):
+        """Number of jobs not yet done or failed"""
+        with self._transaction() as db:
+            query = 'SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)'
+            args = (QUEUED, LEASED)
+            if run_id is not None:
+                query += ' AND run_id = ?'
+                args += (run_id,)
+            return db.execute(query, args).fetchone()[0]
+
+    def jobs(self, run_id=None):
+        with self._transaction() as db:
+            if run_id is None:
+                return [dict(row) for row in db.execute('SELECT * FROM jobs ORDER BY id')]
+            return [dict(row) for row in db.execute('SELECT * FROM jobs WHERE run_id = ? ORDER BY id', (run_id,))]
+
+    def latest_run(self):
+        with self._transaction() as db:
+            row = db.execute('SELECT run_id FROM jobs ORDER BY id DESC LIMIT 1').fetchone()
+        return row['run_id'] if row else None
+
+
+class StagedSink:
+    """Holds a job's rows until commit() passes them on to the worker's sink"""
+
+    def __init__(self, downstream):
+        self.downstream = downstream
+        self.staged = []
+
+    def add(self, sheet_name, rows):
+        self.staged.append((sheet_name, rows))
+
+    def commit(self):
+        for sheet_name, rows in self.staged:
+            self.downstream.add(sheet_name, rows)
+        self.staged = []
+
+    def flush(self):
+        return 0
+
+
+def unstore(collection):
+    """Let a retried job store its rows again: a worker that lost the job may have marked them stored"""
+    checkpoint = Checkpoint(collection)
+    if checkpoint.reached(STORED):
+        checkpoint.extracted(checkpoint.rows())
+
+
+@contextmanager
+def heartbeating(queue, job, worker):
+    """Renew the job's lease in the background while the block runs"""
+    stop = threading.Event()
+    lost = []
+
+    def beat():
+        while not stop.wait(queue.lease_seconds / 3):
+            try:
+                queue.heartbeat(job, worker)
+            except LeaseLost as e:
+                print(f"{e}; its result will be discarded")
+                lost.append(e)
+                return
+            except sqlite3.Error as e:
+                print(f"Heartbeat for job {job.id} failed: {e}")
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        stop.set()
+        thread.join()
+
+
+def enqueue(names, run_id=None, queue=None):
+    """Queue one job per selected collection; returns the run id"""
+    run_id = run_id or new_run_id()
+    jobs = []
+    for brand, collections in select_collections(names).items():
+        for collection in BRANDS[brand].select(collections):
+            jobs.append((brand, collection.name, collection.url))
+    (queue or JobQueue()).enqueue(run_id, jobs)
+    print(f"Queued {len(jobs)} collections for run {run_id}")
+    return run_id
+
+
+def work(queue=None, worker=None, exit_when_empty=False, enrich=False, images=False):
+    """Claim and run jobs until the queue is empty (or forever); returns the number of jobs run.
+
+    The worker keeps one browser session for all of its jobs. A job's rows
+    go to the worker's sink, which uploads them through the Sheets outbox,
+    only once the job is marked done.
+    """
+    queue = queue or JobQueue()
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    sink = default_sink()
+    done = 0
+    with DriverPool(size=1) as pool:
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                if exit_when_empty and not queue.pending():
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+            print(f"{worker}: claimed {job.collection} (run {job.run_id}, attempt {job.attempts})")
+            staged = StagedSink(sink)
+            if job.attempts > 1:
+                unstore(job.collection)
+            with heartbeating(queue, job, worker) as lost:
+                try:
+                    # A retried job continues from the collection's checkpoint; the queue does the retrying
+                    results = run_scraper(job.brand, pool, staged, job.run_id, [job.collection], enrich, images,
+                                          resume=job.attempts > 1, attempts=1, metrics_name=job.collection)
+                    error = None
+                except Exception as e:
+                    results, error = None, e
+            if lost:
+                continue
+            if error is None:
+                if queue.complete(job, worker, {name: len(rows) for name, rows in results.items()}):
+                    staged.commit()
+                else:
+                    print(f"{worker}: lost job {job.id} ({job.collection}) before completing it, discarding its rows")
+            else:
+                # ScrapeFailed carries the collection's own error
+                cause = error.failures.get(job.collection, error) if isinstance(error, ScrapeFailed) else error
+                retry = queue.fail(job, worker, cause)
+                print(f"{worker}: {job.collection} failed{', will be retried' if retry else ''}: {cause}")
+            done += 1
+        pool.report()
+    sink.flush()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('enqueue', help='queue collections for a new run')
+    add.add_argument('names', nargs='*', metavar='brand', help='brands or collections (default: every brand)')
+    add.add_argument('--run-id')
+    worker = sub.add_parser('work', help='claim and run jobs')
+    worker.add_argument('--worker-id')
+    worker.add_argument('--exit-when-empty', action='store_true', help='stop once no job is queued or running')
+    worker.add_argument('--enrich', action='store_true', default=os.environ.get('SCRAPER_ENRICH') == '1')
+    worker.add_argument('--images', action='store_true', default=os.environ.get('SCRAPER_IMAGES') == '1')
+    status = sub.add_parser('status', help='show the jobs of a run')
+    status.add_argument('--run-id', help='default: the latest run')
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        enqueue(args.names or SCRAPERS, args.run_id)
+    elif args.command == 'work':
+        done = work(worker=args.worker_id, exit_when_empty=args.exit_when_empty, enrich=args.enrich,
+                    images=args.images)
+        print(f"Ran {done} jobs")
+    else:
+        queue = JobQueue()
+        run_id = args.run_id or queue.latest_run()
+        for job in queue.jobs(run_id):
+            detail = job['error'] if job['status'] == FAILED else job['result'] or job['worker'] or ''
+            print(f"{job['collection']:<20} {job['status']:<8} attempt {job['attempts']}/{job['max_attempts']}  "
+                  f"{detail}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import json
+import os
+import threading
+
+# Everything the scrapers keep between runs lives under this directory
+STATE_DIR = os.environ.get('SCRAPER_STATE_DIR', '.scraper_state')
+
+_write_lock = threading.Lock()
+
+
+def state_path(*parts):
+    """Return a path under the state directory, creating parent folders"""
+    path = os.path.join(STATE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def load_json(path, default):
+    """Read a JSON state file, falling back to `default` if it is missing or corrupt"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Atomically replace a JSON state file"""
+    with _write_lock:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
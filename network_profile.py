@@ -0,0 +1,106 @@
+"""Network blocking profile applied to every Chrome driver through CDP.
+
+The scrapers only read attribute strings (src, srcset, href) from the page,
+so image bodies, video, fonts and third-party ad, consent and analytics
+scripts are dropped before they are downloaded. Blocking Attentive and
+Osano also means those overlays never appear.
+
+SCRAPER_NETWORK_BLOCK picks the blocked categories: "all" (default), "off",
+or a comma-separated list such as "media,font,analytics". A brand can
+exempt categories or hosts with `block_allow` on its BrandConfig in brands.py,
+e.g. ["image", "klaviyo.com"].
+"""
+import json
+import os
+
+from local_state import load_json, save_json, state_path
+from run_metrics import count
+
+BLOCKED_PATTERNS = {
+    'image': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.mov*', '*.m4s*'],
+    'font': ['*.woff*', '*.ttf*', '*.otf*', '*.eot*'],
+    'ads': [
+        '*doubleclick.net*', '*googlesyndication.com*', '*criteo.com*', '*criteo.net*',
+        '*facebook.net*', '*ct.pinterest.com*', '*analytics.tiktok.com*', '*bat.bing.com*',
+        '*sc-static.net*', '*attentivemobile.com*', '*attn.tv*', '*klaviyo.com*',
+    ],
+    'consent': ['*osano.com*', '*cookielaw.org*', '*onetrust.com*', '*trustarc.com*'],
+    'analytics': [
+        '*googletagmanager.com*', '*google-analytics.com*', '*hotjar.com*', '*quantummetric.com*',
+        '*segment.io*', '*segment.com*', '*fullstory.com*', '*newrelic.com*', '*nr-data.net*',
+    ],
+}
+
+BLOCKED_CATEGORIES = os.environ.get('SCRAPER_NETWORK_BLOCK', 'all')
+
+
+def blocked_patterns(allow=()):
+    """URL patterns for the configured categories, minus allowed categories and hosts"""
+    if BLOCKED_CATEGORIES == 'off':
+        return []
+    if BLOCKED_CATEGORIES == 'all':
+        categories = list(BLOCKED_PATTERNS)
+    else:
+        categories = [c.strip() for c in BLOCKED_CATEGORIES.split(',') if c.strip() in BLOCKED_PATTERNS]
+    hosts = [a for a in allow if a not in BLOCKED_PATTERNS]
+    return [
+        pattern
+        for category in categories if category not in allow
+        for pattern in BLOCKED_PATTERNS[category]
+        if not any(host in pattern for host in hosts)
+    ]
+
+
+def apply_blocking(driver, allow=()):
+    """Set the blocked URL patterns for this driver and discard earlier network log entries"""
+    patterns = blocked_patterns(allow)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    transfer_stats(driver)
+    return patterns
+
+
+def transfer_stats(driver):
+    """Bytes received and requests blocked since the last call, read from Chrome's performance log"""
+    stats = {'bytes': 0, 'requests': 0, 'blocked': 0}
+    try:
+        entries = driver.get_log('performance')
+    except Exception:
+        # Performance logging is off for drivers not built with chrome_options()
+        return stats
+    for entry in entries:
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+        if message.get('method') == 'Network.loadingFinished':
+            stats['bytes'] += int(params.get('encodedDataLength', 0))
+            stats['requests'] += 1
+        elif message.get('method') == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+            stats['blocked'] += 1
+    return stats
+
+
+def report_transfer(driver, name):
+    """Print what a scraper downloaded and how much blocking saved against its last unblocked run.
+
+    Blocked requests never report a size, so savings are measured against
+    the most recent run of the same scraper with SCRAPER_NETWORK_BLOCK=off.
+    """
+    stats = transfer_stats(driver)
+    count('bytes_downloaded', stats['bytes'])
+    count('requests_blocked', stats['blocked'])
+
+    path = state_path('network', f"{name}.json")
+    history = load_json(path, {})
+    mode = 'unblocked' if BLOCKED_CATEGORIES == 'off' else 'blocked'
+    history[mode] = stats
+    save_json(path, history)
+
+    message = (f"{name}: downloaded {stats['bytes'] / 1e6:.1f} MB in {stats['requests']} requests, "
+               f"blocked {stats['blocked']} requests")
+    unblocked = history.get('unblocked')
+    if mode == 'blocked' and unblocked:
+        saved = unblocked['bytes'] - stats['bytes']
+        message += f", {saved / 1e6:.1f} MB less than the last unblocked run ({unblocked['bytes'] / 1e6:.1f} MB)"
+    print(message)
+    return stats
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+
+def domain_of(url):
+    """Return the registrable host of a URL, ignoring a leading www."""
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class TokenBucket:
+    """Blocking token bucket: `capacity` requests at once, refilled at `rate` per second"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class DomainRateLimiter:
+    """One token bucket per domain so collections on the same site are spaced out"""
+
+    def __init__(self, min_interval=30.0, burst=1):
+        self.min_interval = min_interval
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, domain):
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(1.0 / self.min_interval, self.burst)
+            return self._buckets[domain]
+
+    def acquire(self, url):
+        domain = domain_of(url)
+        waited = self.bucket(domain).acquire()
+        if waited:
+            print(f"Waited {waited:.1f}s for {domain} rate limit")
+        return waited
+
+
+def run_concurrently(jobs, run_job, max_workers=3, min_interval=30.0):
+    """Run (name, url) jobs on a thread pool, rate limited per domain.
+
+    `run_job(name)` does the work for one job. Returns a dict mapping each
+    job name to the exception it raised, or None on success.
+    """
+    limiter = DomainRateLimiter(min_interval)
+
+    def limited(name, url):
+        limiter.acquire(url)
+        run_job(name)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(limited, name, url): name for name, url in jobs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                results[name] = None
+            except Exception as e:
+                results[name] = e
+    return results
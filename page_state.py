@@ -0,0 +1,129 @@
+import json
+import re
+
+from row_schema import Row, run_date
+from shopify_fetcher import format_price
+
+# <script id="__NEXT_DATA__" type="application/json">{...}</script> and friends
+JSON_SCRIPT_RE = re.compile(
+    r'<script[^>]*\bid=["\'](__NEXT_DATA__|__NUXT_DATA__|__APOLLO_STATE__|__PRELOADED_STATE__)["\'][^>]*>',
+    re.I,
+)
+# window.__PRELOADED_STATE__ = {...}; style assignments
+STATE_ASSIGN_RE = re.compile(r'window\.(__[A-Z_]+__|[A-Za-z_]*[Ss]tate)\s*=\s*(?=[{\[])')
+
+NAME_KEYS = ('displayName', 'productName', 'name', 'title')
+PRICE_KEYS = ('price', 'listPrice', 'currentPrice', 'salePrice', 'displayPrice', 'minPrice', 'priceRange', 'prices')
+URL_KEYS = ('pdpUrl', 'productUrl', 'url', 'canonicalUrl', 'href', 'link')
+IMAGE_KEYS = ('imageUrl', 'image', 'images', 'skuImages', 'thumbnail', 'primaryImage')
+
+_decoder = json.JSONDecoder()
+
+
+def embedded_states(html):
+    """Yield every JSON state blob embedded in the raw HTML, without building a DOM"""
+    for match in JSON_SCRIPT_RE.finditer(html):
+        start = match.end()
+        end = html.find('</script>', start)
+        if end == -1:
+            continue
+        try:
+            yield json.loads(html[start:end])
+        except ValueError:
+            continue
+
+    for match in STATE_ASSIGN_RE.finditer(html):
+        try:
+            state, _ = _decoder.raw_decode(html, match.end())
+        except ValueError:
+            continue
+        yield state
+
+
+def _first(record, keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+
+def _looks_like_product(value):
+    return (
+        isinstance(value, dict)
+        and _first(value, NAME_KEYS) is not None
+        and _first(value, PRICE_KEYS) is not None
+        and _first(value, URL_KEYS) is not None
+    )
+
+
+def find_product_list(state):
+    """Return the largest list in the state tree whose items look like products"""
+    best = []
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            products = [item for item in node if _looks_like_product(item)]
+            if len(products) > len(best) and len(products) * 2 >= len(node):
+                best = products
+            stack.extend(node)
+    return best
+
+
+def _price_text(value):
+    if isinstance(value, (int, float)) or (isinstance(value, str) and re.fullmatch(r'\d+(\.\d+)?', value)):
+        return format_price(value)
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list) and value:
+        prices = [_price_text(item) for item in value]
+        low, high = prices[0], prices[-1]
+        return low if low == high else f"{low} - {high}"
+    if isinstance(value, dict):
+        low = _first(value, ('min', 'minPrice', 'low', 'amount', 'value', 'current', 'sale', 'regular'))
+        high = _first(value, ('max', 'maxPrice', 'high'))
+        if low is None:
+            return 'Unknown'
+        if high is not None and _price_text(high) != _price_text(low):
+            return f"{_price_text(low)} - {_price_text(high)}"
+        return _price_text(low)
+    return 'Unknown'
+
+
+def _image_url(value):
+    if isinstance(value, list):
+        return _image_url(value[0]) if value else ''
+    if isinstance(value, dict):
+        return _image_url(_first(value, ('url', 'src', 'path', 'href')) or '')
+    if isinstance(value, str):
+        return 'https:' + value if value.startswith('//') else value
+    return ''
+
+
+def extract_products(html, brand, site_url):
+    """Build standard rows from the page's embedded state, or [] if none is found"""
+    records = []
+    for state in embedded_states(html):
+        found = find_product_list(state)
+        if len(found) > len(records):
+            records = found
+
+    today = run_date()
+    products = []
+    for record in records:
+        url = _first(record, URL_KEYS)
+        if isinstance(url, str) and url.startswith('/'):
+            url = site_url + url
+        products.append(Row(
+            len(products) + 1,
+            today,
+            brand,
+            str(_first(record, NAME_KEYS)).strip(),
+            _price_text(_first(record, PRICE_KEYS)),
+            url if isinstance(url, str) else 'Unknown',
+            _image_url(_first(record, IMAGE_KEYS)),
+        ))
+    return products
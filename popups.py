@@ -0,0 +1,119 @@
+import threading
+
+from local_state import load_json, save_json, state_path
+
+# Close buttons shared by most storefronts
+COMMON_CLOSE_BUTTONS = [
+    ("click", "//button[contains(@class, 'close')]"),
+    ("click", "//div[contains(@class, 'modal')]//button"),
+    ("click", "//button[contains(text(), 'Close')]"),
+    ("click", "//button[contains(@aria-label, 'Close')]"),
+]
+
+# Attentive signup iframe and Osano consent dialog used by Alo
+ALO_OVERLAYS = [
+    ("remove", "//iframe[@id='attentive_creative']"),
+    ("click", "//*[contains(@class, 'osano-cm-dialog__close')]"),
+]
+
+# Number of past runs whose matches are tried first
+RECENT_RUNS = 5
+
+# Applies every (action, xpath) entry in one round trip. "click" presses
+# visible matches, "remove" hides and detaches them. If nothing in the
+# primary list matched, the fallback list is tried. Page scrolling is
+# re-enabled either way.
+DISMISS_SCRIPT = """
+const primary = arguments[0];
+const fallback = arguments[1];
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+
+function apply(entries) {
+    const matched = [];
+    for (const [action, xpath] of entries) {
+        const found = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        let hit = false;
+        for (let i = 0; i < found.snapshotLength; i++) {
+            const el = found.snapshotItem(i);
+            try {
+                if (action === 'remove') {
+                    el.style.display = 'none';
+                    el.remove();
+                    hit = true;
+                } else if (el.isConnected && visible(el)) {
+                    el.click();
+                    hit = true;
+                }
+            } catch (e) {}
+        }
+        if (hit) matched.push(xpath);
+    }
+    return matched;
+}
+
+let matched = apply(primary);
+if (!matched.length && fallback.length) matched = apply(fallback);
+
+document.documentElement.style.overflow = 'auto';
+if (document.body) document.body.style.overflow = 'auto';
+return matched;
+"""
+
+_cache_lock = threading.Lock()
+
+
+def _cache_path():
+    return state_path('popup_selectors.json')
+
+
+def recent_matches(brand):
+    """Selectors that matched for `brand` in any of its recent runs"""
+    runs = load_json(_cache_path(), {}).get(brand, [])
+    return {xpath for run in runs for xpath in run}
+
+
+def record_matches(brand, matched):
+    """Remember which selectors matched on this run"""
+    with _cache_lock:
+        cache = load_json(_cache_path(), {})
+        runs = cache.get(brand, [])
+        runs.append(sorted(matched))
+        cache[brand] = runs[-RECENT_RUNS:]
+        save_json(_cache_path(), cache)
+
+
+def selector_order(brand, selectors):
+    """(primary, fallback) selector lists: those that matched on recent runs first, or all of them"""
+    recent = recent_matches(brand)
+    primary = [entry for entry in selectors if entry[1] in recent]
+    fallback = [entry for entry in selectors if entry[1] not in recent]
+    if not primary:
+        return selectors, []
+    return primary, fallback
+
+
+def dismiss_popups(driver, brand, selectors):
+    """Close or remove every known overlay with a single WebDriver call.
+
+    Selectors that matched on recent runs for this brand are tried first and
+    the rest are skipped unless none of those match. Returns the list of
+    selectors that matched, which is empty when nothing was blocking the page.
+    """
+    print("Attempting to close modals and popups...")
+    primary, fallback = selector_order(brand, selectors)
+    try:
+        matched = driver.execute_script(DISMISS_SCRIPT, primary, fallback) or []
+    except Exception as e:
+        print(f"Failed to close modals: {e}")
+        return []
+    return report_matches(brand, matched)
+
+
+def report_matches(brand, matched):
+    """Print and remember the selectors DISMISS_SCRIPT matched; returns them"""
+    for xpath in matched:
+        print(f"Dismissed overlay: {xpath}")
+    if not matched:
+        print("No popups detected.")
+    record_matches(brand, matched)
+    return matched
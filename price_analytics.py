@@ -0,0 +1,228 @@
+"""Price and rank analytics over the local history, computed column-wise.
+
+Loads the Parquet history (history_store.py) as Arrow columns, parses the
+price strings into integer cents and answers trend questions with
+vectorized operations instead of a pass over the sheet:
+- price_changes(): every product whose price differs from its previous snapshot
+- markdowns(): price cuts and sales starting (a compare-at price appearing)
+- rank_movement(): how far a product moved in its collection's order (Index)
+- brand_summary(): products, average and median price, share on sale and
+  markdowns per brand, worksheet and day / week / month
+
+Price strings: "$98" -> 9800; "$59 $98" (sale and compare-at) -> price 5900,
+compare_at 9800; "$68 - $98" (range) -> price 6800, max 9800; "Price not
+found" / "Unknown" -> null.
+
+Usage:
+    python price_analytics.py summary --since 2026-10-01 --by week
+    python price_analytics.py markdowns --brand lululemon --since 2026-10-12
+    python price_analytics.py movers --worksheet lululemon --since 2026-10-01 --out movers.csv
+"""
+import argparse
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from delta import product_key
+from history_store import HistoryStore
+
+# Leading amount, and a second one after a later "$" (sale / compare-at or range end)
+PRICE_RE = r'^[^\d$]*\$?\s*(?P<first>\d+(?:\.\d{1,2})?)(?:[^$]*\$\s*(?P<second>\d+(?:\.\d{1,2})?))?'
+RANGE_RE = r'\d\s*(?:-|–|to)\s*\$'
+
+HISTORY_COLUMNS = ['date', 'brand', 'worksheet', 'index', 'url', 'price']
+
+
+def _cents(amounts):
+    amounts = pc.if_else(pc.equal(amounts, ''), pa.scalar(None, pa.string()), amounts)
+    return pc.cast(pc.round(pc.multiply(pc.cast(amounts, pa.float64()), 100)), pa.int64())
+
+
+def parse_prices(prices):
+    """Price strings -> (price_cents, compare_at_cents, max_cents) int64 arrays, null where absent"""
+    text = pc.replace_substring(pc.cast(prices, pa.string()), ',', '')
+    amounts = pc.extract_regex(text, PRICE_RE)
+    first = _cents(pc.struct_field(amounts, 'first'))
+    second = _cents(pc.struct_field(amounts, 'second'))
+    is_range = pc.fill_null(pc.match_substring_regex(text, RANGE_RE), False)
+    low = pc.min_element_wise(first, second)
+    high = pc.max_element_wise(first, second)
+    null = pa.scalar(None, pa.int64())
+    has_second = pc.is_valid(second)
+    return (
+        pc.if_else(has_second, low, first),
+        pc.if_else(pc.and_(has_second, pc.invert(is_range)), high, null),
+        pc.if_else(pc.and_(has_second, is_range), high, null),
+    )
+
+
+def product_keys(urls):
+    """product_key() of every URL, computed once per distinct URL"""
+    urls = pc.cast(urls, pa.string())
+    unique = pc.unique(urls)
+    keys = pa.array([product_key(url) for url in unique.to_pylist()], pa.string())
+    return pc.take(keys, pc.index_in(urls, unique))
+
+
+def with_prices(table):
+    """Add key, price_cents, compare_at_cents and max_cents columns to a history table"""
+    table = table.combine_chunks()
+    price, compare_at, high = parse_prices(table['price'])
+    return (table
+            .append_column('key', product_keys(table['url']))
+            .append_column('price_cents', price)
+            .append_column('compare_at_cents', compare_at)
+            .append_column('max_cents', high))
+
+
+def load(brand=None, since=None, until=None, worksheet=None, store=None):
+    """History rows with parsed prices, as an Arrow table"""
+    table = (store or HistoryStore()).read(brand=brand, since=since, until=until, worksheet=worksheet,
+                                           columns=HISTORY_COLUMNS)
+    return with_prices(table)
+
+
+def _sequences(table):
+    """Sort by worksheet, product and date; returns the sorted table and, for each row after
+    the first, whether the row before it is the same product in the same worksheet"""
+    group = pc.binary_join_element_wise(table['worksheet'], table['key'], '\x1f')
+    codes = pc.dictionary_encode(group).combine_chunks().indices.to_numpy()
+    days = pc.cast(table['date'], pa.int32()).to_numpy(zero_copy_only=False)
+    order = np.lexsort((days, codes))
+    table = table.take(pa.array(order))
+    codes = codes[order]
+    return table, codes[1:] == codes[:-1]
+
+
+def _column(table, name, fill=0):
+    return pc.fill_null(table[name], fill).to_numpy()
+
+
+def _valid(table, name):
+    return pc.is_valid(table[name]).to_numpy(zero_copy_only=False)
+
+
+def _events(table, mask, extra):
+    """Rows of `table` (after the first) selected by mask, plus computed columns"""
+    rows = np.flatnonzero(mask) + 1
+    picked = table.select(['date', 'brand', 'worksheet', 'url']).take(pa.array(rows))
+    for name, values in extra.items():
+        if isinstance(values, pa.Array):
+            values = values.filter(pa.array(mask))
+        else:
+            values = pa.array(values[mask])
+        picked = picked.append_column(name, values)
+    return picked
+
+
+def price_changes(table):
+    """One row per product snapshot whose price differs from the product's previous snapshot"""
+    table, same = _sequences(table)
+    price = _column(table, 'price_cents')
+    valid = _valid(table, 'price_cents')
+    previous, current = price[:-1], price[1:]
+    mask = same & valid[:-1] & valid[1:] & (previous != current)
+    change = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(previous > 0, change / np.maximum(previous, 1) * 100, np.nan)
+    return _events(table, mask, {
+        'previous_cents': previous,
+        'price_cents': current,
+        'change_cents': change,
+        'change_pct': np.round(pct, 1),
+    })
+
+
+def markdowns(table):
+    """Price cuts and sales starting (compare-at price appearing), one row per event"""
+    table, same = _sequences(table)
+    price = _column(table, 'price_cents')
+    valid = _valid(table, 'price_cents')
+    on_sale = _valid(table, 'compare_at_cents')
+    cut = same & valid[:-1] & valid[1:] & (price[1:] < price[:-1])
+    sale_started = same & on_sale[1:] & ~on_sale[:-1]
+    mask = cut | sale_started
+    kind = np.where(cut, 'price cut', 'sale started')
+    return _events(table, mask, {
+        'kind': kind,
+        'previous_cents': price[:-1],
+        'price_cents': price[1:],
+        'compare_at_cents': table['compare_at_cents'].combine_chunks().slice(1),
+    })
+
+
+def rank_movement(table, max_gap_days=1):
+    """Change in Index between consecutive snapshots (at most max_gap_days apart); positive = moved up"""
+    table, same = _sequences(table)
+    index = _column(table, 'index')
+    days = pc.cast(table['date'], pa.int32()).to_numpy(zero_copy_only=False)
+    mask = same & (days[1:] - days[:-1] <= max_gap_days)
+    return _events(table, mask, {
+        'previous_index': index[:-1],
+        'index': index[1:],
+        'moved': index[:-1] - index[1:],
+    })
+
+
+def brand_summary(table, by='day', keys=('brand', 'worksheet')):
+    """Products, mean and median price, share on sale and markdowns per brand/worksheet and period"""
+    def period(dates):
+        if by == 'day':
+            return dates
+        return pc.cast(pc.floor_temporal(dates, 1, by, week_starts_monday=True), pa.date32())
+
+    group = list(keys) + ['period']
+    rows = table.append_column('period', period(table['date'])).append_column(
+        'on_sale', pc.cast(pc.is_valid(table['compare_at_cents']), pa.int64()))
+    summary = rows.group_by(group).aggregate([
+        ('key', 'count_distinct'),
+        ('price_cents', 'mean'),
+        ('price_cents', 'approximate_median'),
+        ('on_sale', 'mean'),
+    ]).rename_columns(group + ['products', 'mean_cents', 'median_cents', 'share_on_sale'])
+
+    events = markdowns(table)
+    events = events.append_column('period', period(events['date']))
+    counts = events.group_by(group).aggregate([('url', 'count')]).rename_columns(group + ['markdowns'])
+    summary = summary.join(counts, group, join_type='left outer')
+    summary = summary.set_column(summary.schema.get_field_index('markdowns'), 'markdowns',
+                                 pc.fill_null(summary['markdowns'], 0))
+    return summary.sort_by([(k, 'ascending') for k in group])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('report', choices=['summary', 'changes', 'markdowns', 'movers'])
+    parser.add_argument('--brand')
+    parser.add_argument('--worksheet')
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    parser.add_argument('--by', choices=['day', 'week', 'month'], default='day', help='summary period')
+    parser.add_argument('--out', help='write the report to this CSV file instead of printing it')
+    args = parser.parse_args()
+
+    table = load(brand=args.brand, since=args.since, until=args.until, worksheet=args.worksheet)
+    if args.report == 'summary':
+        result = brand_summary(table, by=args.by)
+    elif args.report == 'changes':
+        result = price_changes(table)
+    elif args.report == 'markdowns':
+        result = markdowns(table)
+    else:
+        # Biggest moves either way first
+        result = rank_movement(table)
+        result = result.take(pc.array_sort_indices(pc.abs(result['moved']), order='descending'))
+
+    if args.out:
+        pacsv.write_csv(result, args.out)
+        print(f"Wrote {result.num_rows} rows to {args.out}")
+    else:
+        print(result.slice(0, 50).to_pandas().to_string(index=False))
+        if result.num_rows > 50:
+            print(f"... {result.num_rows - 50} more rows (use --out for all of them)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Product detail enrichment: sizes, colours, compare-at price and stock.
+
+The listing tiles only carry name, price, URL and image. This stage visits
+the product URLs of a scrape over the shared keep-alive HTTP session, many
+at a time but never more than SCRAPER_DETAIL_PER_DOMAIN per site:
+- Shopify brands are read from the storefront's <product url>.js JSON
+- other sites from the schema.org Product JSON-LD in the page
+
+Results are cached on disk per product for SCRAPER_DETAIL_TTL_HOURS, so
+products seen recently are not fetched again, and saved to
+<state dir>/details/brand=<brand>/date=<YYYY-MM-DD>/<worksheet>.parquet.
+
+Usage:
+    python run_all_scrapers.py --enrich
+    python product_details.py export --brand vuori --since 2026-10-01 details.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import requests
+
+from delta import product_key
+from local_state import STATE_DIR, load_json, save_json, state_path
+from orchestrator import domain_of
+from row_schema import run_date
+from run_metrics import count, phase
+from shopify_fetcher import format_price, http_session
+
+DETAIL_WORKERS = int(os.environ.get('SCRAPER_DETAIL_WORKERS', 16))
+DETAIL_PER_DOMAIN = int(os.environ.get('SCRAPER_DETAIL_PER_DOMAIN', 4))
+DETAIL_TTL_HOURS = float(os.environ.get('SCRAPER_DETAIL_TTL_HOURS', 72))
+
+DETAILS_DIR = os.path.join(STATE_DIR, 'details')
+
+DETAIL_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('worksheet', pa.string()),
+    ('url', pa.string()),
+    ('sizes', pa.string()),
+    ('color_count', pa.int32()),
+    ('compare_at_price', pa.string()),
+    ('stock', pa.string()),
+])
+
+IN_STOCK, PARTIAL, SOLD_OUT, UNKNOWN = 'in stock', 'partial', 'sold out', 'unknown'
+
+LD_JSON_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>', re.I)
+AVAILABLE = ('InStock', 'LimitedAvailability', 'OnlineOnly')
+
+_slots = {}
+_slots_lock = threading.Lock()
+
+
+class DetailFetchError(Exception):
+    """A product page could not be read"""
+
+
+def _domain_slot(url):
+    """Semaphore limiting concurrent detail requests to one site, shared by every thread"""
+    domain = domain_of(url)
+    with _slots_lock:
+        if domain not in _slots:
+            _slots[domain] = threading.BoundedSemaphore(DETAIL_PER_DOMAIN)
+        return _slots[domain]
+
+
+def _stock(flags):
+    if not flags:
+        return UNKNOWN
+    if all(flags):
+        return IN_STOCK
+    return PARTIAL if any(flags) else SOLD_OUT
+
+
+def _unique(values):
+    seen = []
+    for value in values:
+        if value and value not in seen:
+            seen.append(value)
+    return seen
+
+
+def shopify_details(product):
+    """Details from a Shopify <product url>.js record (prices in cents)"""
+    variants = product.get('variants') or []
+    # Variant values sit in option1..option3, in the order of the product's options
+    keys = {}
+    for i, option in enumerate(product.get('options') or [], 1):
+        name = option.get('name', '') if isinstance(option, dict) else str(option)
+        keys[name.lower()] = f"option{i}"
+
+    size_key = keys.get('size')
+    color_key = keys.get('color') or keys.get('colour')
+    compare_at = [v['compare_at_price'] for v in variants if v.get('compare_at_price')]
+    prices = [v['price'] for v in variants if v.get('price') is not None]
+    # Shopify leaves compare_at_price equal to (or below) the price when nothing is discounted
+    if compare_at and prices and max(compare_at) <= min(prices):
+        compare_at = []
+    return {
+        'sizes': _unique(v.get(size_key) for v in variants if size_key and v.get('available')),
+        'color_count': len(_unique(v.get(color_key) for v in variants)) if color_key else 1,
+        'compare_at_price': format_price(max(compare_at) / 100) if compare_at else '',
+        'stock': _stock([bool(v.get('available')) for v in variants]),
+    }
+
+
+def _ld_products(data):
+    """Yield every schema.org Product / ProductGroup object in a JSON-LD document"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _ld_products(item)
+    elif isinstance(data, dict):
+        kind = data.get('@type')
+        kinds = kind if isinstance(kind, list) else [kind]
+        if 'Product' in kinds or 'ProductGroup' in kinds:
+            yield data
+        elif '@graph' in data:
+            yield from _ld_products(data['@graph'])
+
+
+def _offers(item):
+    offers = item.get('offers') or []
+    return offers if isinstance(offers, list) else [offers]
+
+
+def json_ld_details(html):
+    """Details from the schema.org Product JSON-LD of a product page, or None"""
+    for match in LD_JSON_RE.finditer(html):
+        end = html.find('</script>', match.end())
+        try:
+            data = json.loads(html[match.end():end])
+        except ValueError:
+            continue
+        for product in _ld_products(data):
+            variants = product.get('hasVariant') or [product]
+            in_stock, sizes, colors, high = [], [], [], []
+            for variant in variants:
+                for offer in _offers(variant):
+                    available = any(a in str(offer.get('availability', '')) for a in AVAILABLE)
+                    in_stock.append(available)
+                    if available:
+                        sizes.append(variant.get('size'))
+                    if offer.get('highPrice') and offer.get('highPrice') != offer.get('lowPrice'):
+                        high.append(float(offer['highPrice']))
+                colors.append(variant.get('color'))
+            return {
+                'sizes': _unique(sizes),
+                'color_count': len(_unique(colors)) or 1,
+                'compare_at_price': format_price(max(high)) if high else '',
+                'stock': _stock(in_stock),
+            }
+    return None
+
+
+def fetch_details(url, shopify, session=None):
+    """Fetch and parse one product page, or raise DetailFetchError"""
+    session = session or http_session()
+    target = url.split('?')[0] + '.js' if shopify else url
+    accept = 'application/json' if shopify else 'text/html'
+    with _domain_slot(url):
+        try:
+            response = session.get(target, headers={'Accept': accept}, timeout=15)
+            response.raise_for_status()
+            details = shopify_details(response.json()) if shopify else json_ld_details(response.text)
+        except (requests.RequestException, ValueError, AttributeError, TypeError) as e:
+            raise DetailFetchError(f"{target}: {e}") from e
+    if details is None:
+        raise DetailFetchError(f"{target}: no product data in the page")
+    return details
+
+
+class DetailCache:
+    """On-disk cache of parsed product details keyed by normalized URL, with a TTL"""
+
+    def __init__(self, ttl_hours=DETAIL_TTL_HOURS):
+        self.ttl = ttl_hours * 3600
+
+    def _path(self, url):
+        digest = hashlib.sha1(product_key(url).encode('utf-8')).hexdigest()
+        return state_path('details', 'cache', digest[:2], f"{digest}.json")
+
+    def get(self, url):
+        entry = load_json(self._path(url), None)
+        if entry and time.time() - entry['fetched'] < self.ttl:
+            return entry['details']
+        return None
+
+    def put(self, url, details):
+        save_json(self._path(url), {'url': url, 'fetched': time.time(), 'details': details})
+
+
+def enrich(rows, shopify, cache=None, session=None):
+    """Details for the product URLs of some rows, keyed by URL.
+
+    Cached products are served from disk; the rest are fetched concurrently.
+    Products that fail to load are left out.
+    """
+    cache = cache or DetailCache()
+    urls = _unique(row.url for row in rows if str(row.url).startswith('http'))
+    details, missing = {}, []
+    for url in urls:
+        cached = cache.get(url)
+        if cached is not None:
+            details[url] = cached
+        else:
+            missing.append(url)
+
+    def fetch(url):
+        try:
+            return url, fetch_details(url, shopify, session)
+        except DetailFetchError as e:
+            print(f"Could not read product details: {e}")
+            return url, None
+
+    failed = 0
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(DETAIL_WORKERS, len(missing))) as executor:
+            for url, result in executor.map(fetch, missing):
+                if result is None:
+                    failed += 1
+                    continue
+                cache.put(url, result)
+                details[url] = result
+
+    count('details_cached', len(urls) - len(missing))
+    count('details_fetched', len(missing) - failed)
+    count('details_failed', failed)
+    print(f"Product details: {len(urls) - len(missing)} cached, {len(missing) - failed} fetched, {failed} failed")
+    return details
+
+
+def save_details(config, worksheet, details):
+    """Write one collection's details to the local details store"""
+    if not details:
+        return None
+    today = run_date()
+    urls = list(details)
+    table = pa.table({
+        'date': pa.array([today] * len(urls), pa.string()).cast(pa.date32()),
+        'worksheet': pa.array([worksheet] * len(urls), pa.string()),
+        'url': pa.array(urls, pa.string()),
+        'sizes': pa.array([', '.join(details[u]['sizes']) for u in urls], pa.string()),
+        'color_count': pa.array([details[u]['color_count'] for u in urls], pa.int32()),
+        'compare_at_price': pa.array([details[u]['compare_at_price'] for u in urls], pa.string()),
+        'stock': pa.array([details[u]['stock'] for u in urls], pa.string()),
+    }, schema=DETAIL_SCHEMA)
+    directory = os.path.join(DETAILS_DIR, f"brand={quote(config.brand, safe='')}", f"date={today}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{worksheet}.parquet")
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp, compression='zstd')
+    os.replace(tmp, path)
+    print(f"Saved details of {len(urls)} products to {path}")
+    return path
+
+
+def enrich_collections(config, collections):
+    """Fetch and store details for every collection's rows (collection name -> rows)"""
+    cache = DetailCache()
+    with phase('enrich'):
+        for worksheet, rows in collections.items():
+            save_details(config, worksheet, enrich(rows, config.shopify, cache))
+
+
+def read_details(brand=None, since=None):
+    """Load stored details as a pyarrow Table"""
+    # pyarrow.dataset imports pandas, so it is only loaded when details are read
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(DETAILS_DIR):
+        return DETAIL_SCHEMA.empty_table()
+    partitioning = ds.partitioning(pa.schema([('brand', pa.string())]), flavor='hive')
+    dataset = ds.dataset(DETAILS_DIR, format='parquet', partitioning=partitioning, exclude_invalid_files=True,
+                         ignore_prefixes=['cache'])
+    condition = None
+    if brand is not None:
+        condition = ds.field('brand') == brand
+    if since is not None:
+        since_filter = ds.field('date') >= pa.scalar(since).cast(pa.date32())
+        condition = since_filter if condition is None else condition & since_filter
+    return dataset.to_table(filter=condition)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help='write stored product details to CSV or Parquet')
+    export.add_argument('out', help='output path ending in .csv or .parquet')
+    export.add_argument('--brand')
+    export.add_argument('--since')
+    args = parser.parse_args()
+
+    table = read_details(brand=args.brand, since=args.since)
+    if args.out.endswith('.parquet'):
+        pq.write_table(table, args.out)
+    else:
+        pacsv.write_csv(table, args.out)
+    print(f"Exported {table.num_rows} product details to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Fixed-schema product rows shared by every extraction path.
+
+Rows are named tuples in worksheet column order, so they go to the sinks
+as they are, without a DataFrame or per-row dicts in between.
+"""
+import datetime
+import threading
+from collections import namedtuple
+
+COLUMNS = ['Index', 'Date', 'Brand', 'Product Name', 'Price', 'URL', 'Image URL']
+
+Row = namedtuple('Row', ['index', 'date', 'brand', 'name', 'price', 'url', 'image_url'])
+
+_run_date = None
+_lock = threading.Lock()
+
+
+def run_date():
+    """Date of this run as YYYY-MM-DD, fixed at the first call so a run past midnight keeps one date"""
+    global _run_date
+    with _lock:
+        if _run_date is None:
+            _run_date = datetime.date.today().isoformat()
+        return _run_date
+
+
+def renumber(rows):
+    """Number rows 1..n in order, e.g. after joining several pages"""
+    return [row if row.index == i else row._replace(index=i) for i, row in enumerate(rows, 1)]
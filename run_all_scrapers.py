@@ -1,55 +1,196 @@
-import subprocess
-import time
+import argparse
 import os
 import sys
+import time
+
+import cdp_engine
+import checkpoints
+import scrape_engine
+from brands import BRANDS, find_collection
+from driver_pool import DriverPool
+from history_store import default_sink
+from image_store import store_collection_images
+from local_state import load_json, save_json, state_path
+from network_profile import report_transfer
+from orchestrator import run_concurrently
+from sheets_outbox import Outbox
+from product_details import enrich_collections
+from run_metrics import aggregate, new_run_id, phase, recording
+from supervision import (ALL_COLLECTIONS, BRAND_DEADLINE, RETRY_ATTEMPTS, Deadline, ScrapeFailed, circuit_breaker,
+                         supervise, watchdog)
+
+# Brands from brands.py that run by default, each with all of its collections
+SCRAPERS = [
+    "vuori",
+    "alo",
+    "lululemon",
+    "beyond_yoga",
+    "athleta"
+]
+
+# Brand -> collections (None for all of them) that failed in the last run, for --retry-failed
+FAILED_PATH = state_path('failed.json')
+
+def select_collections(names):
+    """Map each brand to run onto its selected collection names (None for all of them).
 
-def run_script(script_name):
-    """Run a Python script and capture its output"""
+    A name can be a brand, or a collection to run only that one of its brand.
+    """
+    selection = {}
+    for name in names:
+        if name in BRANDS:
+            selection[name] = None
+            continue
+        config, collection = find_collection(name)
+        if config.name not in selection:
+            selection[config.name] = []
+        if selection[config.name] is not None:
+            selection[config.name].append(collection.name)
+    return selection
+
+def run_scraper(name, pool, sink, run_id, collections=None, enrich=False, images=False, resume=False,
+                attempts=RETRY_ATTEMPTS, metrics_name=None):
+    """Run one brand's collections in one driver session leased from the pool, queueing its rows on the sink.
+
+    Transient failures are tried up to `attempts` times within the brand's
+    deadline. With resume, collections continue from today's checkpoints.
+    Metrics are saved under `metrics_name` (default: the brand). Returns the
+    rows of each collection; raises if any collection could not be scraped.
+    """
     print(f"\n{'='*80}")
-    print(f"Running {script_name}...")
+    print(f"Running {name}...")
     print(f"{'='*80}\n")
-    
+
+    config = BRANDS[name]
+    deadline = Deadline(BRAND_DEADLINE)
+
+    def attempt(names):
+        # Shopify storefronts can skip the browser entirely
+        results = scrape_engine.run_without_browser(config, sink, names, resume)
+        if results is None and cdp_engine.uses_cdp(config):
+            # The DevTools engine loads the collections side by side in its shared Chrome
+            results = cdp_engine.run(config, sink, names, resume, deadline.remaining())
+        elif results is None:
+            with pool.lease(name, config.block_allow) as driver:
+                with watchdog(deadline.remaining(), driver.quit, name):
+                    results = scrape_engine.run(config, driver, sink, names, resume)
+                report_transfer(driver, name)
+        return results
+
+    with recording(metrics_name or name, run_id) as metrics:
+        error = None
+        try:
+            results = supervise(name, attempt, collections, deadline, attempts, run_id)
+        except ScrapeFailed as e:
+            results, error = e.results, e
+        except Exception as e:
+            results, error = {}, e
+
+        # Product pages are read over HTTP, after the browser is back in the pool
+        if results and not circuit_breaker(name, run_id).is_open:
+            if enrich:
+                enrich_collections(config, results)
+            if images:
+                store_collection_images(config, results)
+
+        if error is not None:
+            metrics.error = str(error)
+            print(f"\n❌ Error running {name}: {error}\n")
+            raise error
+        print(f"\n✅ {name} completed successfully.\n")
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the athleisure scrapers")
+    parser.add_argument("scrapers", nargs="*", default=SCRAPERS, metavar="brand",
+                        help="brands or collections from brands.py to run (default: every brand)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SCRAPER_WORKERS", 3)),
+                        help="number of brands scraped at the same time")
+    parser.add_argument("--domain-interval", type=float,
+                        default=float(os.environ.get("SCRAPER_DOMAIN_INTERVAL", 30)),
+                        help="minimum seconds between scrapes that start on the same domain")
+    parser.add_argument("--full-snapshot", action="store_true", default=None,
+                        help="append every product to Google Sheets (the default)")
+    parser.add_argument("--delta", dest="full_snapshot", action="store_false",
+                        help="send only added, removed and re-priced products to Google Sheets")
+    parser.add_argument("--enrich", action="store_true", default=os.environ.get("SCRAPER_ENRICH") == "1",
+                        help="also fetch sizes, colours, compare-at price and stock from the product pages")
+    parser.add_argument("--images", action="store_true", default=os.environ.get("SCRAPER_IMAGES") == "1",
+                        help="also keep a local thumbnail of every product image")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="run only the collections that failed in the previous run, resuming them, "
+                             "and upload the Sheets rows still in the outbox")
+    parser.add_argument("--resume", action="store_true", default=os.environ.get("SCRAPER_RESUME") == "1",
+                        help="continue each collection from the last stage it completed today")
+    args = parser.parse_args()
+    checkpoints.prune()
     try:
-        # Run the script and capture output
-        process = subprocess.Popen(
-            [sys.executable, script_name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True
-        )
-        
-        # Print output in real-time
-        for line in process.stdout:
-            print(line, end='')
-        
-        # Wait for process to complete
-        process.wait()
-        
-        if process.returncode == 0:
-            print(f"\n✅ {script_name} completed successfully.\n")
+        if args.retry_failed:
+            args.resume = True
+            selection = load_json(FAILED_PATH, {}).get("failed", {})
+            # Files from before the selection was saved hold a list of names
+            if isinstance(selection, list):
+                selection = select_collections(selection)
+            if not selection and not Outbox().entries():
+                print("Nothing failed in the previous run")
+                return
         else:
-            print(f"\n❌ {script_name} failed with return code {process.returncode}.\n")
-            
-    except Exception as e:
-        print(f"\n❌ Error running {script_name}: {e}\n")
+            selection = select_collections(args.scrapers)
+    except KeyError as e:
+        choices = sorted(set(BRANDS) | {c.name for config in BRANDS.values() for c in config.collections})
+        parser.error(f"unknown brand or collection {e}; choose from {', '.join(choices)}")
+
+    # Scheduled by the domain of each brand's first collection
+    jobs = [(name, BRANDS[name].collections[0].url) for name in selection]
+
+    # Every scraper writes its phase timings under the same run id
+    run_id = new_run_id()
+    start = time.perf_counter()
+
+    # One Chrome session per worker, reused across brands
+    # Sheets rows are uploaded from the outbox in the background while the brands are scraped
+    sink = default_sink(full_snapshot=args.full_snapshot)
+    errors = {}
+    if jobs:
+        with DriverPool(size=args.workers) as pool:
+            errors = run_concurrently(
+                jobs,
+                lambda name: run_scraper(name, pool, sink, run_id, selection[name], args.enrich, args.images,
+                                         args.resume),
+                max_workers=args.workers,
+                min_interval=args.domain_interval,
+            )
+            pool.report()
+
+    # Rows are already saved locally; wait for the outbox to finish mirroring them to Google Sheets
+    upload_failed = False
+    with recording("sheets_upload", run_id) as metrics:
+        try:
+            with phase("flush"):
+                sink.flush()
+            checkpoints.mark_uploaded()
+        except Exception as e:
+            metrics.error = str(e)
+            upload_failed = True
+            # The rows stay in the outbox for the next run (or --retry-failed) to send
+            print(f"\n❌ Error uploading to Google Sheets: {e}\n")
+
+    aggregate(run_id, wall=round(time.perf_counter() - start, 3))
+
+    failed, retry = [], {}
+    for name, error in errors.items():
+        if isinstance(error, ScrapeFailed) and ALL_COLLECTIONS not in error.failures:
+            failed.extend(error.failures)
+            retry[name] = list(error.failures)
+        elif error is not None:
+            failed.append(name)
+            retry[name] = None
+    save_json(FAILED_PATH, {"run_id": run_id, "failed": retry})
 
-def main():
-    # List of all scraper scripts
-    scrapers = [
-        "scraper_vuori.py",
-        "scraper_alo_new.py",
-        "scraper_lululemon_new.py",
-        "scraper_beyond_yoga.py",
-        "scraper_athleta.py"
-    ]
-    
-    # Run each scraper with a delay between them
-    for scraper in scrapers:
-        run_script(scraper)
-        print("Waiting 30 seconds before running the next scraper...")
-        time.sleep(30)
-    
     print("\nAll scrapers have been executed!")
+    if failed or upload_failed:
+        print(f"Failed: {', '.join(failed + (['Google Sheets upload'] if upload_failed else []))}")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,243 @@
+"""Per-phase timings, memory and tile counts for every scraper run.
+
+Each scraper run records, for every phase (driver setup, page load, popups,
+scrolling, parsing, upload, ...), the wall time, the CPU time of the thread
+doing the work and the peak RSS of this Python process so far. Browser
+processes are not included in the RSS. It also counts tiles found and products
+emitted, so the yield of the selectors is visible.
+
+One JSON file per scraper is written to <state dir>/metrics/<run id>/, and
+run_all_scrapers.py adds a summary.json for the whole run.
+
+Usage:
+    python run_metrics.py [--last 10] [--scraper vuori]
+"""
+import argparse
+import datetime
+import glob
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from local_state import STATE_DIR, load_json, save_json, state_path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_current = threading.local()
+
+
+def new_run_id():
+    return datetime.datetime.now().strftime('%Y%m%dT%H%M%S')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class RunMetrics:
+    """Phases and counters of one scraper run"""
+
+    def __init__(self, scraper, run_id=None):
+        self.scraper = scraper
+        self.run_id = run_id or new_run_id()
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.phases = []
+        self.counts = {}
+        self.error = None
+        self._start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self.wall = None
+        self.cpu = None
+        # Pages of one brand can be parsed in several threads at once
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                'phase': name,
+                'wall': round(time.perf_counter() - wall, 3),
+                'cpu': round(time.thread_time() - cpu, 3),
+                'peak_rss_mb': peak_rss_mb(),
+            })
+
+    def count(self, name, n):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def finish(self):
+        self.wall = round(time.perf_counter() - self._start, 3)
+        self.cpu = round(time.thread_time() - self._cpu_start, 3)
+
+    def to_dict(self):
+        tiles = self.counts.get('tiles', 0)
+        products = self.counts.get('products', 0)
+        return {
+            'scraper': self.scraper,
+            'run_id': self.run_id,
+            'started': self.started,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': self.phases,
+            'counts': self.counts,
+            'yield': round(products / tiles, 3) if tiles else None,
+            'error': self.error,
+        }
+
+    def save(self):
+        path = state_path('metrics', self.run_id, f"{self.scraper}.json")
+        save_json(path, self.to_dict())
+        return path
+
+
+@contextmanager
+def recording(scraper, run_id=None):
+    """Collect the phases this thread runs into a RunMetrics and save it afterwards"""
+    metrics = RunMetrics(scraper, run_id)
+    previous = getattr(_current, 'metrics', None)
+    _current.metrics = metrics
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.error = str(e)
+        raise
+    finally:
+        _current.metrics = previous
+        metrics.finish()
+        try:
+            metrics.save()
+        except OSError as e:
+            print(f"Could not save run metrics: {e}")
+
+
+def current():
+    """The RunMetrics being recorded on this thread, or None"""
+    return getattr(_current, 'metrics', None)
+
+
+@contextmanager
+def attached(metrics):
+    """Record this thread's phases and counters into `metrics` (started on another thread) for the block"""
+    previous = getattr(_current, 'metrics', None)
+    _current.metrics = metrics
+    try:
+        yield
+    finally:
+        _current.metrics = previous
+
+
+@contextmanager
+def phase(name):
+    """Time a phase of the run being recorded on this thread (no-op outside recording())"""
+    metrics = getattr(_current, 'metrics', None)
+    if metrics is None:
+        yield
+        return
+    with metrics.phase(name):
+        yield
+
+
+def count(name, n):
+    """Add to a counter of the run being recorded on this thread"""
+    metrics = getattr(_current, 'metrics', None)
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def load_run(run_id):
+    """Metrics of every scraper in a run, keyed by scraper"""
+    runs = {}
+    for path in sorted(glob.glob(os.path.join(STATE_DIR, 'metrics', run_id, '*.json'))):
+        if os.path.basename(path) != 'summary.json':
+            data = load_json(path, None)
+            if data:
+                runs[data['scraper']] = data
+    return runs
+
+
+def phase_totals(data):
+    totals = {}
+    for p in data['phases']:
+        entry = totals.setdefault(p['phase'], {'wall': 0.0, 'cpu': 0.0})
+        entry['wall'] = round(entry['wall'] + p['wall'], 3)
+        entry['cpu'] = round(entry['cpu'] + p['cpu'], 3)
+    return totals
+
+
+def aggregate(run_id, wall=None):
+    """Write <run id>/summary.json from the per-scraper files and print a table"""
+    runs = load_run(run_id)
+    phases = {}
+    scrapers = {}
+    for name, data in runs.items():
+        totals = phase_totals(data)
+        for phase_name, t in totals.items():
+            entry = phases.setdefault(phase_name, {'wall': 0.0, 'cpu': 0.0})
+            entry['wall'] = round(entry['wall'] + t['wall'], 3)
+            entry['cpu'] = round(entry['cpu'] + t['cpu'], 3)
+        scrapers[name] = {
+            'wall': data['wall'],
+            'cpu': data['cpu'],
+            'tiles': data['counts'].get('tiles', 0),
+            'products': data['counts'].get('products', 0),
+            'yield': data['yield'],
+            'error': data['error'],
+            'phases': totals,
+        }
+    summary = {
+        'run_id': run_id,
+        'wall': wall,
+        'peak_rss_mb': peak_rss_mb(),
+        'scrapers': scrapers,
+        'phases': phases,
+    }
+    save_json(state_path('metrics', run_id, 'summary.json'), summary)
+
+    print(f"\n{'='*80}")
+    print(f"Run metrics ({run_id})")
+    print(f"{'='*80}")
+    print(f"{'scraper':<24} {'wall':>7} {'cpu':>7} {'tiles':>6} {'rows':>6} {'yield':>6}  slowest phases")
+    for name, s in scrapers.items():
+        slowest = sorted(s['phases'].items(), key=lambda item: -item[1]['wall'])[:3]
+        phases_text = ', '.join(f"{p} {t['wall']:.1f}s" for p, t in slowest)
+        yield_text = f"{s['yield']:.0%}" if s['yield'] is not None else '-'
+        print(f"{name:<24} {s['wall']:>6.1f}s {s['cpu']:>6.1f}s {s['tiles']:>6} {s['products']:>6} {yield_text:>6}  {phases_text}")
+    print("Time by phase across scrapers: " + ', '.join(
+        f"{p} {t['wall']:.1f}s" for p, t in sorted(phases.items(), key=lambda item: -item[1]['wall'])))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--last', type=int, default=10, help='number of recent runs to show')
+    parser.add_argument('--scraper', help='only this brand')
+    args = parser.parse_args()
+
+    run_ids = sorted(os.path.basename(p) for p in glob.glob(os.path.join(STATE_DIR, 'metrics', '*')) if os.path.isdir(p))
+    for run_id in run_ids[-args.last:]:
+        for name, data in load_run(run_id).items():
+            if args.scraper and name != args.scraper:
+                continue
+            totals = phase_totals(data)
+            phases_text = '  '.join(f"{p}={t['wall']:.1f}s" for p, t in totals.items())
+            print(f"{run_id}  {name:<24} {data['wall']:>6.1f}s  "
+                  f"{data['counts'].get('products', 0):>4} rows  {phases_text}")
+
+
+if __name__ == '__main__':
+    main()
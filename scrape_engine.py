@@ -0,0 +1,409 @@
+"""One scraping engine for every brand in brands.py.
+
+Loads each collection of a brand (and its further pages) in one browser
+session, clears popups, scrolls until the tiles stop growing and reads the
+rows described by the brand's field rules, or takes the Shopify JSON /
+embedded page state shortcuts where the brand has them. Every collection is
+uploaded to its own worksheet.
+"""
+import itertools
+import os
+import re
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from selenium.webdriver.common.action_chains import ActionChains
+
+import cdp_engine
+from checkpoints import CAPTURED, EXTRACTED, STORED, Checkpoint, mark_uploaded
+from delta import product_key
+from driver_pool import create_driver
+from history_store import default_sink
+from html_parsers import make_soup
+from local_state import save_json, state_path
+from page_state import extract_products
+from popups import dismiss_popups
+from row_schema import Row, renumber, run_date
+from run_metrics import count, phase, recording
+from scroll_engine import scroll_until_stable
+from shopify_fetcher import FETCH_MODE, ShopifyFetchError, fetch_products
+from supervision import (BRAND_DEADLINE, PHASE_DEADLINES, Deadline, EmptyCollection, ScrapeFailed,
+                         phase_deadline, supervise, watchdog)
+
+# Columns read from each tile, in row order after Index/Date/Brand
+TILE_COLUMNS = ['Product Name', 'Price', 'URL', 'Image URL']
+
+
+def _absolute(url, site_url):
+    if url.startswith('//'):
+        return 'https:' + url
+    if url.startswith('http'):
+        return url
+    return site_url + url
+
+
+def _srcset_url(srcset, pick):
+    # Candidates are separated by a comma and whitespace; URLs may contain bare commas
+    candidates = [c.split()[0] for c in re.split(r',\s+', srcset.strip()) if c.strip()]
+    if not candidates:
+        return ''
+    return candidates[-1] if pick == 'last' else candidates[0]
+
+
+def _value(element, rule):
+    if rule.contains is not None:
+        text = element.text.strip()
+        return text if rule.contains in element.text else None
+    if not rule.attrs:
+        return element.text.strip()
+    for attr in rule.attrs:
+        value = element.get(attr)
+        if isinstance(value, str) and value:
+            return _srcset_url(value, rule.srcset) if attr == 'srcset' else value
+    return None
+
+
+def _find(root, rule):
+    for selector in rule.selectors:
+        candidates = root.select(selector) if rule.contains is not None else [root.select_one(selector)]
+        for element in candidates:
+            if element is not None:
+                value = _value(element, rule)
+                if value is not None:
+                    return value
+    return None
+
+
+def read_field(tile, rule, site_url):
+    """Apply one Field rule to a tile; returns None if a required field is missing"""
+    value = _find(tile, rule)
+    parent = tile.parent
+    while value is None and rule.search_parents and parent is not None:
+        value = _find(parent, rule)
+        parent = parent.parent
+    if value is None:
+        return None if rule.required else rule.default
+    if rule.strip_query:
+        value = value.split('?')[0]
+    if rule.absolute or value.startswith('//'):
+        value = _absolute(value, site_url)
+    return value
+
+
+def parse_tiles(config, html):
+    """Yield product rows from the rendered tiles of one page"""
+    soup = make_soup(html, config.parser, config.tile_scope)
+    today = run_date()
+    rules = [config.fields[column] for column in TILE_COLUMNS]
+    index = 0
+
+    product_tiles = soup.select(config.tile_selector)
+    print(f"Found {len(product_tiles)} product tiles")
+    count('tiles', len(product_tiles))
+
+    for tile in product_tiles:
+        try:
+            if any(len(tile.select(selector)) < n for selector, n in config.tile_requires.items()):
+                continue
+            values = []
+            for rule in rules:
+                value = read_field(tile, rule, config.site_url)
+                if value is None:
+                    break
+                values.append(value)
+            else:
+                index += 1
+                yield Row(index, today, config.brand, *values)
+        except Exception as e:
+            print(f"Error processing product tile: {e}")
+
+
+def parse_page(config, html):
+    """Product rows of one page, preferring the page's embedded state over rendered tiles"""
+    if config.page_state:
+        products = extract_products(html, config.brand, config.site_url)
+        if products:
+            print(f"Found {len(products)} products in embedded page state")
+            count('tiles', len(products))
+            return products
+    return parse_tiles(config, html)
+
+
+def page_urls(config, collection):
+    """The collection URL followed by its ?page=2, 3, ... URLs up to max_pages"""
+    yield collection.url
+    parts = urlsplit(collection.url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    for page in range(2, collection.max_pages + 1):
+        paged = [(k, v) for k, v in query if k != config.page_param] + [(config.page_param, str(page))]
+        yield urlunsplit(parts._replace(query=urlencode(paged)))
+
+
+def scrape(driver, config, url, first_page=True):
+    """Load one collection page and return the rendered HTML.
+
+    Later pages of the same session skip the long load wait and the popup
+    fallbacks: consent was given and the assets are cached by then.
+    """
+    print(f"Opening URL: {url}")
+    driver.set_page_load_timeout(PHASE_DEADLINES['load'])
+    with phase('load'), phase_deadline('load', driver):
+        driver.get(url)
+        print("Waiting for page to load...")
+        time.sleep(config.load_wait if first_page else config.next_load_wait)
+
+    with phase('popups'), phase_deadline('popups', driver):
+        matched = dismiss_popups(driver, config.brand, config.popup_selectors)
+        # Overlays that come back are closed above; the fallbacks are for the first load only
+        if first_page:
+            if matched and config.popup_fallback == 'refresh':
+                # Refresh the page to ensure clean state
+                print("Refreshing page to ensure clean state...")
+                driver.refresh()
+                time.sleep(2)
+                driver.execute_script("document.documentElement.style.overflow = 'auto';")
+            elif not matched and config.popup_fallback == 'click_outside':
+                try:
+                    ActionChains(driver).move_by_offset(10, 10).click().perform()
+                    # Move the mouse back to avoid offset issues in future actions
+                    ActionChains(driver).move_by_offset(-10, -10).perform()
+                except Exception as e:
+                    print(f"Failed to click outside the modal: {e}")
+
+    # The hydration state already lists every product, so there is nothing to scroll for
+    if config.page_state:
+        with phase('page_state'), phase_deadline('page_state', driver):
+            html = driver.page_source
+            if extract_products(html, config.brand, config.site_url):
+                print("Found product list in embedded page state, skipping scrolling")
+                return html
+
+    print("Scrolling to load all products...")
+    with phase('scroll'), phase_deadline('scroll', driver):
+        scroll_until_stable(driver, config.tile_selector, max_seconds=PHASE_DEADLINES['scroll'])
+
+    return driver.page_source
+
+
+def new_rows(rows, seen):
+    """Rows whose product was not already listed on an earlier page of the collection"""
+    fresh = []
+    for row in rows:
+        key = product_key(row.url)
+        if key not in seen:
+            seen.add(key)
+            fresh.append(row)
+    return fresh
+
+
+def note_duplicates(config, collections):
+    """Print and record products listed in more than one of the brand's collections.
+
+    `collections` maps collection name to its rows. The overlap is saved to
+    <state dir>/overlap/<brand>.json; every collection keeps its own rows.
+    """
+    listed = {}
+    for name, rows in collections.items():
+        for row in rows:
+            if str(row.url).startswith('http'):
+                names = listed.setdefault(product_key(row.url), [])
+                if name not in names:
+                    names.append(name)
+    shared = {key: names for key, names in listed.items() if len(names) > 1}
+    count('cross_collection_duplicates', len(shared))
+    if len(collections) > 1:
+        print(f"{config.name}: {len(shared)} of {len(listed)} products appear in more than one collection")
+        save_json(state_path('overlap', f"{config.name}.json"), {'date': run_date(), 'products': shared})
+    return shared
+
+
+def upload(sheet_name, products, sink):
+    """Queue product rows for a collection's worksheet on the sink"""
+    data_to_append = renumber(products)
+    count('products', len(data_to_append))
+    sink.add(sheet_name, data_to_append)
+
+
+def upload_collections(config, collections, sink):
+    """Upload every collection that has rows; raises ScrapeFailed naming the empty ones.
+
+    Collections are marked stored as soon as the sink has their rows; the
+    caller flushes the sink (and marks them uploaded) after the scrape, so a
+    Sheets error never costs a second scrape.
+    """
+    note_duplicates(config, collections)
+    with phase('upload'):
+        for name, products in collections.items():
+            if products:
+                upload(name, products, sink)
+                Checkpoint(name).stored()
+    empty = {name: EmptyCollection("no product data found") for name, products in collections.items() if not products}
+    if empty:
+        raise ScrapeFailed(empty, {name: rows for name, rows in collections.items() if rows})
+
+
+def _load_pages(driver, config, collection, checkpoint, session, start=1):
+    """Load a collection's pages one at a time from page `start`, saving each to the checkpoint"""
+    if start == 1:
+        checkpoint.start()
+    for page, url in enumerate(page_urls(config, collection), 1):
+        if page < start:
+            continue
+        html_content = scrape(driver, config, url, session['first_page'])
+        session['first_page'] = False
+        with phase('archive'):
+            checkpoint.add_page(url, html_content)
+        yield url, html_content
+    checkpoint.captured()
+
+
+def extract(config, checkpoint, pages):
+    """Rows of a collection's pages; a page that adds no new products ends the collection"""
+    products, seen = [], set()
+    for page, (url, html_content) in enumerate(pages, 1):
+        print("Extracting product data...")
+        with phase('parse'):
+            fresh = new_rows(parse_page(config, html_content), seen)
+        if not fresh and page > 1:
+            print(f"Page {page} of {checkpoint.worksheet} has no new products, stopping")
+            checkpoint.captured()
+            break
+        products.extend(fresh)
+    return products
+
+
+def resumed(checkpoint, resume):
+    """Whether an earlier attempt today already stored this collection's rows"""
+    if resume and checkpoint.reached(STORED):
+        print(f"{checkpoint.worksheet}: already {checkpoint.stage} today, skipping")
+        return True
+    return False
+
+
+def finish_run(config, collected, results, failures, sink):
+    """Upload the collected rows and raise ScrapeFailed if any collection failed"""
+    try:
+        upload_collections(config, collected, sink)
+        results.update(collected)
+    except ScrapeFailed as e:
+        failures.update(e.failures)
+        results.update(e.results)
+    if failures:
+        raise ScrapeFailed(failures, results)
+    return results
+
+
+def run(config, driver, sink=None, names=None, resume=False):
+    """Scrape the brand's collections in one browser session and upload the results.
+
+    `names` limits the run to those collections. A page that adds no new
+    products ends the collection's pagination early. Returns the rows of
+    each collection, keyed by its name, once uploaded. Collections that
+    failed are raised together as ScrapeFailed after the rest are uploaded.
+    With `resume`, collections continue from today's checkpoint.
+    """
+    results, collected, failures = {}, {}, {}
+    session = {'first_page': True}
+    for collection in config.select(names):
+        checkpoint = Checkpoint(collection.name)
+        if resumed(checkpoint, resume):
+            results[collection.name] = checkpoint.rows()
+            continue
+        try:
+            if resume and checkpoint.reached(EXTRACTED):
+                print(f"{collection.name}: resuming from the extracted rows")
+                products = checkpoint.rows()
+            else:
+                if resume and checkpoint.reached(CAPTURED):
+                    print(f"{collection.name}: resuming from {checkpoint.page_count} captured pages")
+                    pages = checkpoint.pages()
+                    if not checkpoint.complete:
+                        pages = itertools.chain(pages, _load_pages(
+                            driver, config, collection, checkpoint, session, start=checkpoint.page_count + 1))
+                else:
+                    pages = _load_pages(driver, config, collection, checkpoint, session)
+                products = extract(config.for_collection(collection), checkpoint, pages)
+                if products:
+                    checkpoint.extracted(products)
+        except Exception as e:
+            print(f"Error scraping {collection.name}: {e}")
+            failures[collection.name] = e
+            continue
+        collected[collection.name] = products
+    return finish_run(config, collected, results, failures, sink)
+
+
+def run_without_browser(config, sink=None, names=None, resume=False):
+    """Try the Shopify collection JSON route; returns the rows of each collection, or None"""
+    if not config.shopify or FETCH_MODE == 'browser':
+        return None
+    results, collected = {}, {}
+    try:
+        with phase('fetch'):
+            for collection in config.select(names):
+                checkpoint = Checkpoint(collection.name)
+                if resumed(checkpoint, resume):
+                    results[collection.name] = checkpoint.rows()
+                elif resume and checkpoint.reached(EXTRACTED):
+                    collected[collection.name] = checkpoint.rows()
+                else:
+                    collected[collection.name] = fetch_products(collection.url, config.brand)
+                    if collected[collection.name]:
+                        checkpoint.extracted(collected[collection.name])
+    except ShopifyFetchError as e:
+        if FETCH_MODE == 'json':
+            raise
+        print(f"Collection JSON unavailable, falling back to the browser: {e}")
+        return None
+    count('tiles', sum(len(products) for products in collected.values()))
+    return finish_run(config, collected, results, {}, sink)
+
+
+def main(config, names=None):
+    """Run one brand on its own (optionally only the named collections), with its own browser if needed.
+
+    SCRAPER_RESUME=1 continues each collection from today's checkpoint.
+    Exits with status 1 if any collection could not be scraped.
+    """
+    deadline = Deadline(BRAND_DEADLINE)
+    resume = os.environ.get('SCRAPER_RESUME') == '1'
+    sink = default_sink()
+
+    def attempt(names):
+        results = run_without_browser(config, sink, names, resume)
+        if results is not None:
+            return results
+        if cdp_engine.uses_cdp(config):
+            return cdp_engine.run(config, sink, names, resume, deadline.remaining())
+        driver = create_driver(config.block_allow)
+        try:
+            with watchdog(deadline.remaining(), driver.quit, config.name):
+                return run(config, driver, sink, names, resume)
+        finally:
+            print("Closing browser...")
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    failed = False
+    with recording(config.name) as metrics:
+        try:
+            supervise(config.name, attempt, names, deadline)
+        except Exception as e:
+            metrics.error = str(e)
+            print(f"Error in script: {e}")
+            failed = True
+
+        # Outside the supervised attempts: rows left in the outbox are sent by the next run, not re-scraped
+        try:
+            with phase('flush'):
+                sink.flush()
+            mark_uploaded()
+        except Exception as e:
+            metrics.error = metrics.error or str(e)
+            print(f"Error uploading to Google Sheets: {e}")
+            failed = True
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,107 @@
+import time
+from dataclasses import dataclass
+
+# Scroll one viewport, then resolve once the DOM has stopped changing (or
+# after step_timeout if nothing changed at all) with the tile count and
+# document height.
+SCROLL_STEP_SCRIPT = """
+const selector = arguments[0];
+const stepTimeout = arguments[1];
+const settleDelay = arguments[2];
+const done = arguments[arguments.length - 1];
+
+const snapshot = () => {
+    const root = document.documentElement;
+    return {
+        count: document.querySelectorAll(selector).length,
+        height: root.scrollHeight,
+        atBottom: window.innerHeight + window.pageYOffset >= root.scrollHeight - 2
+    };
+};
+
+let settleTimer = null;
+const observer = new MutationObserver(() => {
+    clearTimeout(settleTimer);
+    settleTimer = setTimeout(finish, settleDelay);
+});
+const timeout = setTimeout(finish, stepTimeout);
+let finished = false;
+function finish() {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timeout);
+    clearTimeout(settleTimer);
+    done(snapshot());
+}
+
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['src', 'srcset']});
+window.scrollBy(0, window.innerHeight);
+"""
+
+
+@dataclass
+class ScrollStats:
+    steps: int = 0
+    tiles: int = 0
+    height: int = 0
+    settle_seconds: float = 0.0
+    settled: bool = False
+
+
+def scroll_until_stable(driver, tile_selector, quiet_period=3.0, step_timeout=1.5,
+                        settle_delay=0.25, max_steps=80, max_seconds=120.0):
+    """Scroll until the tile count and page height stop growing.
+
+    Each step scrolls one viewport and waits on DOM mutations instead of a
+    fixed sleep. Scrolling stops once the bottom of the page is reached and
+    neither the number of `tile_selector` matches nor the document height
+    has changed for `quiet_period` seconds. `max_steps`/`max_seconds` are
+    safety caps; hitting one leaves `settled` False in the returned stats.
+    """
+    driver.set_script_timeout(step_timeout + settle_delay + 10)
+    progress = ScrollProgress(quiet_period, max_steps, max_seconds)
+    while progress.running():
+        state = driver.execute_async_script(
+            SCROLL_STEP_SCRIPT, tile_selector, int(step_timeout * 1000), int(settle_delay * 1000)
+        )
+        progress.record(state)
+    return progress.finish()
+
+
+class ScrollProgress:
+    """When to stop scrolling, given the state SCROLL_STEP_SCRIPT returns after each step"""
+
+    def __init__(self, quiet_period, max_steps, max_seconds):
+        self.quiet_period = quiet_period
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.stats = ScrollStats()
+        self.start = time.monotonic()
+        self.last_change = self.start
+        self.last = None
+
+    def running(self):
+        return (not self.stats.settled and self.stats.steps < self.max_steps
+                and time.monotonic() - self.start < self.max_seconds)
+
+    def record(self, state):
+        self.stats.steps += 1
+        now = time.monotonic()
+        current = (state["count"], state["height"])
+        if current != self.last:
+            self.last = current
+            self.last_change = now
+            print(f"Scroll {self.stats.steps}: {state['count']} tiles, height {state['height']}")
+        elif state["atBottom"] and now - self.last_change >= self.quiet_period:
+            self.stats.settled = True
+
+    def finish(self):
+        stats = self.stats
+        stats.tiles, stats.height = self.last if self.last else (0, 0)
+        stats.settle_seconds = self.last_change - self.start
+        if stats.settled:
+            print(f"Scrolling settled after {stats.steps} steps: {stats.tiles} tiles in {stats.settle_seconds:.1f}s")
+        else:
+            print(f"Warning: stopped scrolling at the {stats.steps}-step/{self.max_seconds:.0f}s cap with {stats.tiles} tiles still loading")
+        return stats
@@ -0,0 +1,253 @@
+"""Durable outbox for Google Sheets rows, drained by a background uploader.
+
+Sinks add rows and return straight away: every add() is written to
+<state dir>/outbox/ as one JSON file before anything is sent. A background
+thread uploads the oldest files in batches of up to SCRAPER_SHEETS_BATCH_ROWS
+rows (one batchUpdate each), at most SCRAPER_SHEETS_WRITES_PER_MINUTE times a
+minute, and deletes them once Sheets has accepted them. Quota (429) and server
+errors are retried with jittered exponential backoff, honouring Retry-After, up
+to SCRAPER_SHEETS_RETRIES times in a row; after that, and after any other
+error, the rows stay on disk for the next run.
+
+Rows left over by an earlier process are sent by the next one, before its own.
+An uploader locks each file of the batch it is sending, holding the outbox
+lock only while it picks them, so several processes sharing the outbox never
+send the same rows twice and never wait on each other's requests.
+
+Usage:
+    python sheets_outbox.py status
+    python sheets_outbox.py drain
+"""
+import argparse
+import fcntl
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from local_state import STATE_DIR, load_json, save_json
+from sheets_sink import SheetsSink
+from supervision import TRANSIENT, backoff, classify
+
+OUTBOX_DIR = os.path.join(STATE_DIR, 'outbox')
+# The Sheets API allows 60 write requests a minute per user
+WRITES_PER_MINUTE = float(os.environ.get('SCRAPER_SHEETS_WRITES_PER_MINUTE', 50))
+BATCH_ROWS = int(os.environ.get('SCRAPER_SHEETS_BATCH_ROWS', 5000))
+# How long flush() waits for the outbox to empty
+DRAIN_TIMEOUT = float(os.environ.get('SCRAPER_SHEETS_DRAIN_TIMEOUT', 600))
+# Transient failures in a row before the uploader gives up until the next run
+RETRIES = int(os.environ.get('SCRAPER_SHEETS_RETRIES', 8))
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 120.0
+# How often to look again while other uploaders are sending every waiting file
+BUSY_POLL = 2.0
+
+
+class Outbox:
+    """Rows waiting for Sheets, one file per add(), oldest first"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or OUTBOX_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq = itertools.count()
+
+    def put(self, worksheet, rows):
+        # Time first so files sort in the order they were added, across processes
+        name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._seq):06d}.json"
+        save_json(os.path.join(self.directory, name), {'worksheet': worksheet, 'rows': [list(row) for row in rows]})
+
+    def entries(self):
+        return sorted(glob.glob(os.path.join(self.directory, '*.json')))
+
+    @contextmanager
+    def locked(self):
+        """Hold the outbox's lock (shared by every process using the directory)"""
+        with open(os.path.join(self.directory, 'upload.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _claim(self, path):
+        """(open file holding a lock on the entry, entry), or None if another uploader has it"""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # Sent and removed by another uploader since the directory was listed
+            if os.fstat(f.fileno()).st_nlink == 0:
+                raise FileNotFoundError(path)
+            return f, json.load(f)
+        except (OSError, ValueError):
+            f.close()
+            return None
+
+    @contextmanager
+    def claimed(self, max_rows=BATCH_ROWS):
+        """Lock the oldest entries no other uploader is sending, up to max_rows rows (at least one entry).
+
+        Yields (paths, worksheet -> rows). The outbox lock is only held while
+        the entries are picked; the entries stay locked until the block ends.
+        """
+        files, paths, pending, total = [], [], {}, 0
+        try:
+            with self.locked():
+                for path in self.entries():
+                    claim = self._claim(path)
+                    if claim is None:
+                        continue
+                    f, entry = claim
+                    if paths and total + len(entry['rows']) > max_rows:
+                        f.close()
+                        break
+                    files.append(f)
+                    paths.append(path)
+                    pending.setdefault(entry['worksheet'], []).extend(entry['rows'])
+                    total += len(entry['rows'])
+            yield paths, pending
+        finally:
+            for f in files:
+                f.close()
+
+    def remove(self, paths):
+        for path in paths:
+            os.remove(path)
+
+    def pending_rows(self):
+        """Number of rows waiting, by worksheet"""
+        counts = {}
+        for path in self.entries():
+            entry = load_json(path, {'worksheet': None, 'rows': []})
+            counts[entry['worksheet']] = counts.get(entry['worksheet'], 0) + len(entry['rows'])
+        return counts
+
+
+def retry_after(error):
+    """Seconds asked for by a Retry-After header on the error's response, if any"""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers['Retry-After'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class OutboxSink:
+    """Sink that queues Sheets rows in the outbox; a background thread uploads them.
+
+    flush() waits until the outbox is empty and raises if rows are still
+    waiting after DRAIN_TIMEOUT seconds, or the uploader hit an error that
+    retrying cannot fix or failed `retries` times in a row. Either way the
+    rows stay in the outbox.
+    """
+
+    def __init__(self, writer=None, outbox=None, writes_per_minute=WRITES_PER_MINUTE, batch_rows=BATCH_ROWS,
+                 retries=RETRIES):
+        self.writer = writer or SheetsSink()
+        self.outbox = outbox or Outbox()
+        self.interval = 60.0 / writes_per_minute
+        self.batch_rows = batch_rows
+        self.retries = retries
+        self.written = 0
+        self.error = None
+        self._next_write = 0.0
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, sheet_name, rows):
+        """Save rows (sequences of cell values) for a worksheet and return; they are uploaded in the background"""
+        self.outbox.put(sheet_name, rows)
+        print(f"Queued {len(rows)} rows for worksheet '{sheet_name}'")
+        self._start()
+        self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.error = None
+                self._thread = threading.Thread(target=self._upload, name='sheets-outbox', daemon=True)
+                self._thread.start()
+
+    def _pause(self, seconds):
+        """Sleep, ending early if new rows arrive"""
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def _upload(self):
+        """Drain the outbox until it is empty or a write fails for good"""
+        failures = 0
+        while True:
+            paths, pending = [], {}
+            # Quota pacing: space out write requests evenly
+            wait = self._next_write - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                with self.outbox.claimed(self.batch_rows) as (paths, pending):
+                    if paths:
+                        self._next_write = time.monotonic() + self.interval
+                        self.written += self.writer.write(pending)
+                        self.outbox.remove(paths)
+            except Exception as e:
+                failures += 1
+                if classify(e) != TRANSIENT or failures > self.retries:
+                    print(f"Sheets upload failed, keeping {sum(len(r) for r in pending.values())} rows "
+                          f"in the outbox: {e}")
+                    self.error = e
+                    with self._idle:
+                        self._idle.notify_all()
+                    return
+                delay = max(backoff(failures, BACKOFF_BASE, BACKOFF_CAP), retry_after(e) or 0)
+                print(f"Sheets upload failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            failures = 0
+            if not paths:
+                with self._idle:
+                    self._idle.notify_all()
+                self._pause(BUSY_POLL if self.outbox.entries() else None)
+
+    def flush(self, timeout=DRAIN_TIMEOUT):
+        """Wait until every row in the outbox (including earlier runs' rows) is uploaded; returns the rows written"""
+        if not self.outbox.entries():
+            return self.written
+        self._start()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self.outbox.entries() and self.error is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(min(remaining, 1.0))
+        if self.error is not None:
+            raise self.error
+        waiting = sum(self.outbox.pending_rows().values())
+        if waiting:
+            raise TimeoutError(f"{waiting} rows still in the Sheets outbox after {timeout:.0f}s")
+        return self.written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['status', 'drain'])
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        counts = Outbox().pending_rows()
+        for worksheet, rows in sorted(counts.items()):
+            print(f"{worksheet}: {rows} rows")
+        print(f"{sum(counts.values())} rows waiting in {len(Outbox().entries())} files")
+    else:
+        print(f"Uploaded {OutboxSink().flush()} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import threading
+
+import gspread
+from google.oauth2.service_account import Credentials
+
+CREDS_PATH = os.environ.get('CREDS_PATH', '/Users/pleng/python/pleng.io/spatial-framing-452703-g4-d9e7337e6b02.json')
+SHEET_ID = os.environ.get('SHEET_ID', "1G4cuYs_7qD1ft6OEhovLjj8zowQc92yYHQz2gSmLpp8")
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+# Size of worksheets created for new brands
+NEW_SHEET_ROWS = 1000
+NEW_SHEET_COLS = 20
+
+
+def cell(value):
+    """Convert a Python value to a Sheets CellData, like append_rows with RAW input"""
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    if value is None:
+        return {}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+class SheetsSink:
+    """Collects rows for every worksheet and writes them in one batch.
+
+    Authentication happens once. flush() makes one metadata request to
+    resolve the worksheets (skipped when they are already known), then
+    sends one batchUpdate that creates any missing worksheets and appends
+    the rows for all of them.
+    """
+
+    def __init__(self, sheet_id=SHEET_ID, creds_path=CREDS_PATH):
+        self.sheet_id = sheet_id
+        self.creds_path = creds_path
+        self._client = None
+        self._pending = {}
+        self._sheet_ids = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            creds = Credentials.from_service_account_file(self.creds_path, scopes=SCOPES)
+            self._client = gspread.authorize(creds)
+        return self._client
+
+    def add(self, sheet_name, rows):
+        """Queue rows (sequences of cell values) for a worksheet"""
+        with self._lock:
+            self._pending.setdefault(sheet_name, []).extend(rows)
+        print(f"Queued {len(rows)} rows for worksheet '{sheet_name}'")
+
+    def flush(self):
+        """Write every queued row; returns the number of rows written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        try:
+            return self.write(pending)
+        except Exception:
+            # Put the rows back so a later flush can retry them
+            with self._lock:
+                for name, rows in pending.items():
+                    self._pending[name] = rows + self._pending.get(name, [])
+            raise
+
+    def write(self, pending):
+        """Append rows (worksheet -> rows) in one batchUpdate; returns the number of rows written.
+
+        The worksheet ids are looked up once and reused by later writes.
+        """
+        pending = {name: rows for name, rows in pending.items() if rows}
+        if not pending:
+            return 0
+
+        http = self.client.http_client
+        if self._sheet_ids is None or any(name not in self._sheet_ids for name in pending):
+            metadata = http.fetch_sheet_metadata(self.sheet_id, params={'fields': 'sheets.properties(sheetId,title)'})
+            self._sheet_ids = {s['properties']['title']: s['properties']['sheetId'] for s in metadata.get('sheets', [])}
+        sheet_ids = dict(self._sheet_ids)
+
+        requests = []
+        next_id = max(sheet_ids.values(), default=0) + 1
+        for name in pending:
+            if name not in sheet_ids:
+                sheet_ids[name] = next_id
+                next_id += 1
+                requests.append({'addSheet': {'properties': {
+                    'sheetId': sheet_ids[name],
+                    'title': name,
+                    'gridProperties': {'rowCount': NEW_SHEET_ROWS, 'columnCount': NEW_SHEET_COLS},
+                }}})
+                print(f"Creating worksheet '{name}'")
+
+        for name, rows in pending.items():
+            requests.append({'appendCells': {
+                'sheetId': sheet_ids[name],
+                'rows': [{'values': [cell(v) for v in row]} for row in rows],
+                'fields': 'userEnteredValue',
+            }})
+
+        try:
+            http.batch_update(self.sheet_id, {'requests': requests})
+        except Exception:
+            # The worksheets may have changed; look them up again next time
+            self._sheet_ids = None
+            raise
+        self._sheet_ids = sheet_ids
+
+        total = sum(len(rows) for rows in pending.values())
+        print(f"Data successfully uploaded to Google Sheets! ({total} rows across {len(pending)} worksheets)")
+        return total
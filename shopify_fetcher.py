@@ -0,0 +1,114 @@
+import os
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from driver_pool import USER_AGENT
+from row_schema import Row, run_date
+
+# "auto" tries the collection JSON first and falls back to the browser,
+# "json" never opens a browser, "browser" skips the JSON route entirely
+FETCH_MODE = os.environ.get('SCRAPER_FETCH_MODE', 'auto')
+
+PAGE_LIMIT = 250
+MAX_PAGES = 40
+
+_session = None
+
+
+class ShopifyFetchError(Exception):
+    """The collection JSON route could not produce products"""
+
+
+def http_session():
+    """Shared keep-alive HTTP session for every storefront request"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers.update({'User-Agent': USER_AGENT, 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+
+def collection_json_url(collection_url):
+    """Map a /collections/<handle> page URL to its products.json endpoint"""
+    parsed = urlparse(collection_url)
+    path = parsed.path.rstrip('/')
+    if '/collections/' not in path:
+        raise ShopifyFetchError(f"Not a Shopify collection URL: {collection_url}")
+    return f"{parsed.scheme}://{parsed.netloc}{path}/products.json"
+
+
+def format_price(amount):
+    """Render a Shopify price string the way the storefront shows it ("$98", "$49.50")"""
+    try:
+        value = Decimal(str(amount))
+    except InvalidOperation:
+        return "Unknown"
+    if value == value.to_integral_value():
+        return f"${value:.0f}"
+    return f"${value:.2f}"
+
+
+def fetch_collection_products(collection_url, session=None):
+    """Read every product record of a collection, following page numbers"""
+    session = session or http_session()
+    endpoint = collection_json_url(collection_url)
+    products = []
+    for page in range(1, MAX_PAGES + 1):
+        try:
+            response = session.get(endpoint, params={'limit': PAGE_LIMIT, 'page': page}, timeout=15)
+            response.raise_for_status()
+            batch = response.json().get('products', [])
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            raise ShopifyFetchError(f"{endpoint} page {page}: {e}") from e
+        products.extend(batch)
+        if len(batch) < PAGE_LIMIT:
+            break
+    if not products:
+        raise ShopifyFetchError(f"{endpoint} returned no products")
+    return products
+
+
+def product_rows(records, brand, site_url):
+    """Map Shopify product records to the Index/Date/Brand/... row schema"""
+    today = run_date()
+    rows = []
+    for record in records:
+        prices = []
+        for variant in record.get('variants') or []:
+            try:
+                prices.append(Decimal(str(variant['price'])))
+            except (KeyError, InvalidOperation):
+                continue
+
+        images = record.get('images') or []
+        image_url = images[0].get('src', '') if images else ''
+        if image_url.startswith('//'):
+            image_url = 'https:' + image_url
+
+        rows.append(Row(
+            len(rows) + 1,
+            today,
+            brand,
+            (record.get('title') or 'Unknown').strip(),
+            format_price(min(prices)) if prices else 'Unknown',
+            f"{site_url}/products/{record['handle']}" if record.get('handle') else 'Unknown',
+            image_url,
+        ))
+    return rows
+
+
+def fetch_products(collection_url, brand, site_url=None):
+    """Fetch a collection's rows over HTTP, or raise ShopifyFetchError"""
+    if site_url is None:
+        parsed = urlparse(collection_url)
+        site_url = f"{parsed.scheme}://{parsed.netloc}"
+    print(f"Fetching collection JSON for {collection_url}...")
+    rows = product_rows(fetch_collection_products(collection_url), brand, site_url)
+    print(f"Fetched {len(rows)} products without a browser")
+    return rows
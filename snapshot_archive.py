@@ -0,0 +1,231 @@
+"""Content-addressed archive of rendered pages with offline replay.
+
+Every scrape stores driver.page_source under its SHA-256, compressed with
+zstd against a per-worksheet reference snapshot used as a raw-content
+dictionary. Consecutive days differ little, so each new page costs only
+its differences from the reference.
+
+Layout under <state dir>/snapshots/:
+    objects/<sha[:2]>/<sha>.zst   compressed pages, after a line naming their dictionary
+    dicts/<sha>.zst               reference pages used as dictionaries
+    references/<worksheet>.json   the worksheet's current reference page
+    entries/<worksheet>/*.json    worksheet, date, URL and object of each snapshot
+
+Every file is written once under a unique or content-derived name (or
+replaced atomically), so several processes can archive at the same time
+without a shared index to lock. index.json from earlier versions is still read.
+
+Usage:
+    python snapshot_archive.py list [--worksheet vuori]
+    python snapshot_archive.py replay vuori [--date 2026-10-17] [--out rows.csv]
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import glob
+import hashlib
+import io
+import os
+import threading
+import time
+
+import zstandard
+
+from local_state import STATE_DIR, load_json, save_json, state_path
+from row_schema import COLUMNS
+
+# Set SCRAPER_ARCHIVE=0 to stop storing snapshots
+ARCHIVE_ENABLED = os.environ.get('SCRAPER_ARCHIVE', '1') != '0'
+
+# Start a fresh reference page when the current one is this old or compresses badly
+DICT_MAX_AGE_DAYS = 30
+DICT_MIN_RATIO = 8
+LEVEL = 19
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _legacy_index_path():
+    return state_path('snapshots', 'index.json')
+
+
+def _object_path(sha):
+    return state_path('snapshots', 'objects', sha[:2], f"{sha}.zst")
+
+
+def _dict_path(sha):
+    return state_path('snapshots', 'dicts', f"{sha}.zst")
+
+
+def _reference_path(worksheet):
+    return state_path('snapshots', 'references', f"{worksheet}.json")
+
+
+def _write(path, data):
+    # Unique per writer: two processes may store the same object at once
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load_dictionary(sha):
+    with open(_dict_path(sha), 'rb') as f:
+        raw = zstandard.ZstdDecompressor().decompress(f.read())
+    return zstandard.ZstdCompressionDict(raw, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+
+def _read_object(sha):
+    """(dictionary SHA, compressed page) of a stored object; the SHA is None for objects from before the header"""
+    with open(_object_path(sha), 'rb') as f:
+        data = f.read()
+    if data.startswith(ZSTD_MAGIC):
+        return None, data
+    header, data = data.split(b'\n', 1)
+    return header.decode('ascii'), data
+
+
+def archive_snapshot(worksheet, url, html, date=None):
+    """Store a rendered page and record a snapshot entry for it; returns its SHA-256"""
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        return _archive(worksheet, url, html, date)
+    except (OSError, zstandard.ZstdError) as e:
+        # Archiving is for debugging; never lose a run over it
+        print(f"Could not archive snapshot: {e}")
+        return None
+
+
+def _archive(worksheet, url, html, date):
+    raw = html.encode('utf-8')
+    sha = hashlib.sha256(raw).hexdigest()
+    date = date or datetime.date.today().isoformat()
+
+    if os.path.exists(_object_path(sha)):
+        dict_sha = _object_dict(sha)
+        stored = 0
+    else:
+        current = _reference(worksheet)
+        stale = current is None or (
+            datetime.date.fromisoformat(date) - datetime.date.fromisoformat(current['date'])
+        ).days > DICT_MAX_AGE_DAYS
+        if not stale:
+            data = zstandard.ZstdCompressor(level=LEVEL, dict_data=_load_dictionary(current['sha'])).compress(raw)
+            stale = len(raw) / max(len(data), 1) < DICT_MIN_RATIO
+        if stale:
+            # This page becomes the reference for the next ones
+            _write(_dict_path(sha), zstandard.ZstdCompressor(level=LEVEL).compress(raw))
+            save_json(_reference_path(worksheet), {'sha': sha, 'date': date})
+            current = {'sha': sha}
+            data = zstandard.ZstdCompressor(level=LEVEL, dict_data=_load_dictionary(sha)).compress(raw)
+        dict_sha = current['sha']
+        # The object names its own dictionary: another process may store the same page against a different one
+        _write(_object_path(sha), dict_sha.encode('ascii') + b'\n' + data)
+        stored = len(data)
+
+    entry = {'worksheet': worksheet, 'date': date, 'url': url, 'sha': sha,
+             'dict': dict_sha, 'bytes': len(raw), 'stored': stored}
+    save_json(state_path('snapshots', 'entries', worksheet, f"{time.time_ns():020d}-{sha[:12]}.json"), entry)
+
+    print(f"Archived snapshot {sha[:12]} ({len(raw) / 1024:.0f} KB page, {stored / 1024:.1f} KB stored)")
+    return sha
+
+
+def _reference(worksheet):
+    current = load_json(_reference_path(worksheet), None)
+    if current is None:
+        current = load_json(_legacy_index_path(), {'dicts': {}})['dicts'].get(worksheet)
+    return current
+
+
+def _object_dict(sha):
+    dict_sha = _read_object(sha)[0]
+    if dict_sha is not None:
+        return dict_sha
+    for entry in load_json(_legacy_index_path(), {'snapshots': []})['snapshots']:
+        if entry['sha'] == sha:
+            return entry['dict']
+    return None
+
+
+def snapshots(worksheet=None):
+    """Snapshot entries, oldest first"""
+    legacy = load_json(_legacy_index_path(), {'snapshots': []})['snapshots']
+    entries = [e for e in legacy if worksheet is None or e['worksheet'] == worksheet]
+    pattern = os.path.join(STATE_DIR, 'snapshots', 'entries', worksheet or '*', '*.json')
+    # File names start with the time they were written
+    for path in sorted(glob.glob(pattern), key=os.path.basename):
+        entry = load_json(path, None)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def load_snapshot(entry):
+    """Decompress an archived page back to HTML"""
+    dict_sha, data = _read_object(entry['sha'])
+    decompressor = zstandard.ZstdDecompressor(dict_data=_load_dictionary(dict_sha or entry['dict']))
+    return decompressor.decompress(data).decode('utf-8')
+
+
+def replay(name, date=None, sha=None):
+    """Run a collection's extraction on an archived page; returns (entry, rows, seconds)"""
+    # Imported here because the engine archives snapshots through this module
+    from brands import find_collection
+    from scrape_engine import parse_page
+
+    config, collection = find_collection(name)
+    entries = snapshots(collection.name)
+    if date:
+        entries = [e for e in entries if e['date'] == date]
+    if sha:
+        entries = [e for e in entries if e['sha'].startswith(sha)]
+    if not entries:
+        raise SystemExit(f"No archived snapshot of {collection.name} matches")
+    entry = entries[-1]
+
+    html = load_snapshot(entry)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        rows = list(parse_page(config, html))
+        seconds = time.perf_counter() - start
+    # Rows carry the day the page was captured, not today
+    rows = [row._replace(date=entry['date']) for row in rows]
+    return entry, rows, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    listing = sub.add_parser('list', help='show archived snapshots')
+    listing.add_argument('--worksheet')
+    rerun = sub.add_parser('replay', help="re-run a scraper's extraction on an archived page")
+    rerun.add_argument('brand', help='collection from brands.py, e.g. vuori or lululemon_new')
+    rerun.add_argument('--date', help='capture date (default: latest)')
+    rerun.add_argument('--sha', help='snapshot hash prefix')
+    rerun.add_argument('--out', help='write the rows to this CSV file')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for e in snapshots(args.worksheet):
+            print(f"{e['date']}  {e['worksheet']:<16} {e['sha'][:12]}  {e['bytes'] / 1024:7.0f} KB -> {e['stored'] / 1024:6.1f} KB  {e['url']}")
+        return
+
+    entry, rows, seconds = replay(args.brand, args.date, args.sha)
+    print(f"Replayed {entry['worksheet']} from {entry['date']} ({entry['sha'][:12]}): {len(rows)} rows in {seconds * 1000:.1f} ms")
+    if args.out:
+        with open(args.out, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+        print(f"Wrote rows to {args.out}")
+    else:
+        for row in rows[:10]:
+            print(row)
+        if len(rows) > 10:
+            print(f"... {len(rows) - 10} more")
+
+
+if __name__ == '__main__':
+    main()
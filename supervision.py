@@ -0,0 +1,238 @@
+"""Deadlines, retries and circuit breakers around every scrape.
+
+- Every browser phase (load, popups, page_state, scroll) has a deadline in
+  PHASE_DEADLINES. Selenium's own page-load and script timeouts are set to
+  it; if the phase is still running GRACE seconds later, a watchdog quits
+  the driver so the blocked call raises.
+- Every brand has a wall-clock budget (SCRAPER_BRAND_DEADLINE) covering all
+  of its attempts, enforced the same way.
+- Failed collections are retried when the error is transient (timeouts,
+  browser errors, connection errors, HTTP 429/5xx, empty pages) with full
+  jitter backoff, up to SCRAPER_RETRIES attempts in total.
+- After SCRAPER_BREAKER_FAILURES consecutive failures a brand's circuit
+  opens and the brand is skipped for the rest of the run, including its
+  enrichment stages.
+
+Phase deadlines can be overridden with e.g. SCRAPER_PHASE_DEADLINES="load=45,scroll=200".
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+import urllib3
+from selenium.common.exceptions import WebDriverException
+
+PHASE_DEADLINES = {'load': 60, 'popups': 30, 'page_state': 20, 'scroll': 150}
+PHASE_DEADLINES.update({
+    name.strip(): float(seconds)
+    for name, _, seconds in (item.partition('=') for item in os.environ.get('SCRAPER_PHASE_DEADLINES', '').split(','))
+    if seconds
+})
+# Selenium's own timeouts get this long to fire before the watchdog quits the driver
+GRACE = 10
+
+BRAND_DEADLINE = float(os.environ.get('SCRAPER_BRAND_DEADLINE', 900))
+RETRY_ATTEMPTS = int(os.environ.get('SCRAPER_RETRIES', 3))
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 30.0
+# Don't start another attempt with less time than this left
+MIN_ATTEMPT_SECONDS = 60
+BREAKER_FAILURES = int(os.environ.get('SCRAPER_BREAKER_FAILURES', 3))
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+
+class DeadlineExceeded(Exception):
+    """A phase or brand ran past its deadline"""
+
+
+class EmptyCollection(Exception):
+    """A collection produced no rows"""
+
+
+class CircuitOpen(Exception):
+    """The brand failed too often and is skipped for the rest of the run"""
+
+
+# Key of a failure that hit the whole brand (e.g. the browser did not start) rather than named collections.
+# Not a brand name: a brand can have a collection of the same name.
+ALL_COLLECTIONS = '*'
+
+
+class ScrapeFailed(Exception):
+    """Some collections failed; `failures` maps them (or ALL_COLLECTIONS) to their error.
+
+    `results` holds the rows of the rest.
+    """
+
+    def __init__(self, failures, results=None):
+        self.failures = failures
+        self.results = results or {}
+        super().__init__('; '.join(f"{name}: {error}" for name, error in failures.items()))
+
+
+def classify(error):
+    """TRANSIENT if retrying may help, PERMANENT otherwise"""
+    # urllib3 / connection errors also come from a driver whose browser has gone away
+    if isinstance(error, (DeadlineExceeded, EmptyCollection, WebDriverException, requests.ConnectionError,
+                          requests.Timeout, urllib3.exceptions.HTTPError, ConnectionError, TimeoutError)):
+        return TRANSIENT
+    # gspread's APIError carries the HTTP response too
+    response = getattr(error, 'response', None)
+    if isinstance(error, requests.HTTPError) or isinstance(response, requests.Response):
+        status = response.status_code if response is not None else None
+        return TRANSIENT if status is None or status == 429 or status >= 500 else PERMANENT
+    # Wrapped errors (e.g. ShopifyFetchError) are as retryable as their cause
+    if error.__cause__ is not None:
+        return classify(error.__cause__)
+    return PERMANENT
+
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full jitter delay before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Deadline:
+    """A wall-clock budget"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+
+@contextmanager
+def watchdog(seconds, on_expire, label):
+    """Call on_expire (e.g. driver.quit) if the block is still running after `seconds`.
+
+    The block is expected to fail once on_expire has run; whatever it
+    raises then is reported as DeadlineExceeded.
+    """
+    fired = threading.Event()
+
+    def expire():
+        fired.set()
+        print(f"{label} exceeded its {seconds:.0f}s deadline, stopping it")
+        try:
+            on_expire()
+        except Exception as e:
+            print(f"Error stopping {label}: {e}")
+
+    timer = threading.Timer(seconds, expire)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except Exception as e:
+        if fired.is_set():
+            raise DeadlineExceeded(f"{label} exceeded {seconds:.0f}s") from e
+        raise
+    else:
+        if fired.is_set():
+            raise DeadlineExceeded(f"{label} exceeded {seconds:.0f}s")
+    finally:
+        timer.cancel()
+
+
+@contextmanager
+def phase_deadline(name, driver):
+    """Hard deadline for one browser phase of a scrape"""
+    with watchdog(PHASE_DEADLINES[name] + GRACE, driver.quit, f"{name} phase"):
+        yield
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and stays open for the rest of the run"""
+
+    def __init__(self, name, threshold=BREAKER_FAILURES):
+        self.name = name
+        self.threshold = threshold
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.failures >= self.threshold
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures == self.threshold:
+                print(f"{self.name}: {self.failures} failures in a row, skipping it for the rest of the run")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(name, run_id=None):
+    """The breaker of a brand for one run; a queue worker lives through many runs"""
+    with _breakers_lock:
+        key = (run_id, name)
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(name)
+        return _breakers[key]
+
+
+def supervise(name, attempt, names=None, deadline=None, attempts=RETRY_ATTEMPTS, run_id=None):
+    """Call attempt(names) and retry the collections that failed with a transient error.
+
+    `attempt` returns the rows of each collection it scraped, or raises
+    ScrapeFailed for the collections that failed (any other exception
+    fails all of `names`). Returns the rows of every collection, or raises
+    ScrapeFailed with the collections that could not be scraped. The brand's
+    circuit breaker is the one of `run_id`.
+    """
+    breaker = circuit_breaker(name, run_id)
+    deadline = deadline or Deadline(BRAND_DEADLINE)
+    results, final = {}, {}
+    for n in range(1, attempts + 1):
+        if breaker.is_open:
+            raise CircuitOpen(f"{name} is skipped after {breaker.failures} failures in a row")
+        try:
+            results.update(attempt(names))
+            breaker.record_success()
+            break
+        except ScrapeFailed as e:
+            results.update(e.results)
+            failures = e.failures
+        except Exception as e:
+            # A deadline cutting a run short keeps the collections that had already finished
+            partial = e.__cause__ if isinstance(e.__cause__, ScrapeFailed) else None
+            if partial is not None:
+                results.update(partial.results)
+                failures = {collection: e for collection in partial.failures}
+            elif names is not None:
+                failures = {collection: e for collection in names}
+            else:
+                failures = {ALL_COLLECTIONS: e}
+        breaker.record_failure()
+
+        retry = {c: e for c, e in failures.items() if classify(e) == TRANSIENT}
+        final.update({c: e for c, e in failures.items() if c not in retry})
+        if not retry:
+            break
+        delay = backoff(n)
+        if n == attempts or deadline.remaining() < delay + MIN_ATTEMPT_SECONDS:
+            final.update(retry)
+            break
+        print(f"{name}: {', '.join(f'{name if c == ALL_COLLECTIONS else c} ({e})' for c, e in retry.items())} failed, "
+              f"retrying in {delay:.1f}s (attempt {n + 1} of {attempts})")
+        time.sleep(delay)
+        # A failure of the whole brand retries the same selection, otherwise only the failed collections
+        if ALL_COLLECTIONS not in retry:
+            names = list(retry)
+    if final:
+        raise ScrapeFailed(final, results)
+    return results